@@ -1,9 +1,14 @@
 from zxcvbn import scoring
 from . import adjacency_graphs
 from zxcvbn.frequency_lists import FREQUENCY_LISTS
+import functools
 import re
+import threading
+from collections import OrderedDict
 
-from zxcvbn.scoring import most_guessable_match_sequence
+from pwstrength.adapters.match_record import MatchRecord
+
+from .scoring_script import most_guessable_match_sequence
 
 
 def build_ranked_dict(ordered_list):
@@ -13,12 +18,96 @@ RANKED_DICTIONARIES = {}
 
 
 def add_frequency_lists(frequency_lists_):
+    global _DICTIONARY_INDEX
     for name, lst in frequency_lists_.items():
         RANKED_DICTIONARIES[name] = build_ranked_dict(lst)
+    # the combined index is rebuilt lazily on the next dictionary match, and
+    # cached repeat analyses may no longer hold.
+    _DICTIONARY_INDEX = None
+    with _REPEAT_BASE_LOCK:
+        _REPEAT_BASE_CACHE.clear()
+
 
+_DICTIONARY_INDEX = None
+REPEAT_CACHE_SIZE = 4096
+_REPEAT_BASE_CACHE = OrderedDict()
+# matching runs on several threads at once; the lock covers each cache step,
+# not the analysis, which recurses into omnimatch.
+_REPEAT_BASE_LOCK = threading.Lock()
 
 add_frequency_lists(FREQUENCY_LISTS)
 
+
+# dictionary index -- one flat hash trie over every ranked dictionary.
+#
+# keys are dictionary words and every proper prefix of a dictionary word.
+# a word maps to a tuple of (dictionary_name, rank) pairs, in the iteration
+# order of the ranked dictionaries; a prefix that isn't itself a word maps to
+# an empty tuple. growing password_lower[i:j + 1] one character at a time can
+# stop as soon as the slice is missing from the index, so each start position
+# costs at most one probe per character of the longest dictionary word
+# starting there, for all dictionaries at once, instead of one probe per
+# (i, j, dictionary).
+def build_dictionary_index(ranked_dictionaries):
+    index = {}
+    for dictionary_name, ranked_dict in ranked_dictionaries.items():
+        for word, rank in ranked_dict.items():
+            index[word] = index.get(word, ()) + ((dictionary_name, rank),)
+    prefixes = {word[:k] for word in index for k in range(1, len(word))}
+    index.update(dict.fromkeys(prefixes.difference(index), ()))
+    return index
+
+
+# indexes for caller-supplied dictionaries, keyed by the id of the mapping.
+# each entry keeps the mapping alive (so the id stays unique) together with
+# the names, ids and sizes of its lists, and is rebuilt when those change.
+CUSTOM_INDEX_CACHE_SIZE = 8
+_CUSTOM_INDEXES = OrderedDict()
+_CUSTOM_INDEX_LOCK = threading.Lock()
+
+
+def _dictionaries_version(ranked_dictionaries):
+    return tuple(
+        (name, id(ranked_dict), len(ranked_dict))
+        for name, ranked_dict in ranked_dictionaries.items()
+    )
+
+
+def _custom_dictionary_index(ranked_dictionaries):
+    key = id(ranked_dictionaries)
+    version = _dictionaries_version(ranked_dictionaries)
+    with _CUSTOM_INDEX_LOCK:
+        entry = _CUSTOM_INDEXES.get(key)
+        if entry is not None and entry[0] is ranked_dictionaries \
+                and entry[1] == version:
+            _CUSTOM_INDEXES.move_to_end(key)
+            return entry[2]
+    index = build_dictionary_index(ranked_dictionaries)
+    with _CUSTOM_INDEX_LOCK:
+        _CUSTOM_INDEXES[key] = (ranked_dictionaries, version, index)
+        _CUSTOM_INDEXES.move_to_end(key)
+        while len(_CUSTOM_INDEXES) > CUSTOM_INDEX_CACHE_SIZE:
+            _CUSTOM_INDEXES.popitem(last=False)
+    return index
+
+
+def get_dictionary_index(_ranked_dictionaries=RANKED_DICTIONARIES):
+    global _DICTIONARY_INDEX
+    if _ranked_dictionaries is not RANKED_DICTIONARIES:
+        return _custom_dictionary_index(_ranked_dictionaries)
+    if _DICTIONARY_INDEX is None:
+        _DICTIONARY_INDEX = build_dictionary_index(RANKED_DICTIONARIES)
+    return _DICTIONARY_INDEX
+
+
+# install a prebuilt index for the default dictionaries -- anything with the
+# same get() as build_dictionary_index's dict, such as the memory-mapped
+# index in pwstrength.adapters.dictionary_index. add_frequency_lists drops
+# it again, since it would no longer cover every list.
+def set_dictionary_index(index):
+    global _DICTIONARY_INDEX
+    _DICTIONARY_INDEX = index
+
 GRAPHS = {
     'qwerty': adjacency_graphs.ADJACENCY_GRAPHS['qwerty'],
     'dvorak': adjacency_graphs.ADJACENCY_GRAPHS['dvorak'],
@@ -47,6 +136,8 @@ REGEXEN = {
 
 DATE_MAX_YEAR = 2050
 DATE_MIN_YEAR = 1000
+DATE_CACHE_SIZE = 65536
+DATE_RUN_RX = re.compile(r'[\d\s/\\_.-]+')
 DATE_SPLITS = {
     4: [  # for length-4 strings, eg 1191 or 9111, two ways to split:
         [1, 2],  # 1 1 91 (2nd split starts at index 1, 3rd at index 2)
@@ -78,57 +169,99 @@ DATE_SPLITS = {
 def omnimatch(password, _ranked_dictionaries=RANKED_DICTIONARIES):
     matches = []
     for matcher in [
-        dictionary_match,
-        reverse_dictionary_match,
-        l33t_match,
-        spatial_match,
-        repeat_match,
+        dictionary_and_reverse_match,
+        l33t_index_match,
+        spatial_table_match,
+        repeat_scan_match,
         sequence_match,
         regex_match,
-        date_match,
+        date_run_match,
     ]:
         matches.extend(matcher(password, _ranked_dictionaries=_ranked_dictionaries))
 
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+    return sorted(matches, key=lambda x: (x.i, x.j))
 
 
 # dictionary match (common passwords, english, last names, etc)
-def dictionary_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
+def _index_walk(password_lower, index, i, length):
+    # yields (j, entries) for every dictionary word password_lower[i:j + 1].
+    for j in range(i, length):
+        entries = index.get(password_lower[i:j + 1])
+        if entries is None:
+            return
+        if entries:
+            yield j, entries
+
+
+def _dictionary_matches(password, index):
     matches = []
     length = len(password)
     password_lower = password.lower()
-    for dictionary_name, ranked_dict in _ranked_dictionaries.items():
-        for i in range(length):
-            for j in range(i, length):
-                if password_lower[i:j + 1] in ranked_dict:
-                    word = password_lower[i:j + 1]
-                    rank = ranked_dict[word]
-                    matches.append({
-                        'pattern': 'dictionary',
-                        'i': i,
-                        'j': j,
-                        'token': password[i:j + 1],
-                        'matched_word': word,
-                        'rank': rank,
-                        'dictionary_name': dictionary_name,
-                        'reversed': False,
-                        'l33t': False,
-                    })
-
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+    for i in range(length):
+        for j, entries in _index_walk(password_lower, index, i, length):
+            word = password_lower[i:j + 1]
+            for dictionary_name, rank in entries:
+                matches.append(MatchRecord(
+                    pattern='dictionary',
+                    i=i,
+                    j=j,
+                    token=password[i:j + 1],
+                    matched_word=word,
+                    rank=rank,
+                    dictionary_name=dictionary_name,
+                    reversed=False,
+                    l33t=False,
+                ))
+
+    # the walk already emits matches in (i, j) order.
+    return matches
+
+
+def _reverse_dictionary_matches(password, index):
+    matches = []
+    length = len(password)
+    reversed_password = ''.join(reversed(password))
+    reversed_lower = reversed_password.lower()
+    for i in range(length):
+        for j, entries in _index_walk(reversed_lower, index, i, length):
+            word = reversed_lower[i:j + 1]
+            token = password[length - 1 - j:length - i]
+            for dictionary_name, rank in entries:
+                matches.append(MatchRecord(
+                    pattern='dictionary',
+                    i=length - 1 - j,
+                    j=length - 1 - i,
+                    token=token,
+                    matched_word=word,
+                    rank=rank,
+                    dictionary_name=dictionary_name,
+                    reversed=True,
+                    l33t=False,
+                ))
+
+    return sorted(matches, key=lambda x: (x.i, x.j))
+
+
+def dictionary_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
+    index = get_dictionary_index(_ranked_dictionaries)
+    return _dictionary_matches(password, index)
 
 
 def reverse_dictionary_match(password,
                              _ranked_dictionaries=RANKED_DICTIONARIES):
-    reversed_password = ''.join(reversed(password))
-    matches = dictionary_match(reversed_password, _ranked_dictionaries)
-    for match in matches:
-        match['token'] = ''.join(reversed(match['token']))
-        match['reversed'] = True
-        match['i'], match['j'] = len(password) - 1 - match['j'], \
-                                 len(password) - 1 - match['i']
+    index = get_dictionary_index(_ranked_dictionaries)
+    return _reverse_dictionary_matches(password, index)
+
 
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+# forward and reversed dictionary matches from a single index lookup. the
+# result is the forward matches followed by the reversed ones, which is what
+# omnimatch's stable sort saw when it called the two matchers one after the
+# other.
+def dictionary_and_reverse_match(password,
+                                 _ranked_dictionaries=RANKED_DICTIONARIES):
+    index = get_dictionary_index(_ranked_dictionaries)
+    return _dictionary_matches(password, index) + \
+        _reverse_dictionary_matches(password, index)
 
 
 def relevant_l33t_subtable(password, table):
@@ -223,8 +356,8 @@ def l33t_match(password, _ranked_dictionaries=RANKED_DICTIONARIES,
 
         subbed_password = translate(password, sub)
         for match in dictionary_match(subbed_password, _ranked_dictionaries):
-            token = password[match['i']:match['j'] + 1]
-            if token.lower() == match['matched_word']:
+            token = password[match.i:match.j + 1]
+            if token.lower() == match.matched_word:
                 # only return the matches that contain an actual substitution
                 continue
 
@@ -233,17 +366,156 @@ def l33t_match(password, _ranked_dictionaries=RANKED_DICTIONARIES,
             for subbed_chr, chr in sub.items():
                 if subbed_chr in token:
                     match_sub[subbed_chr] = chr
-            match['l33t'] = True
-            match['token'] = token
-            match['sub'] = match_sub
-            match['sub_display'] = ', '.join(
-                ["%s -> %s" % (k, v) for k, v in match_sub.items()]
-            )
-            matches.append(match)
+            matches.append(match.replace(
+                l33t=True,
+                token=token,
+                sub=match_sub,
+                sub_display=', '.join(
+                    ["%s -> %s" % (k, v) for k, v in match_sub.items()]
+                ),
+            ))
+
+    matches = [match for match in matches if len(match.token) > 1]
+
+    return sorted(matches, key=lambda x: (x.i, x.j))
+
+
+# l33t match without enumerating substitution maps.
+#
+# enumerate_l33t_subs returns the cartesian product of the substitution maps
+# of independent groups of letters: two letters only interact when they share
+# a l33t character (i, l and t in L33T_TABLE). l33t_component_subs keeps one
+# short list of maps per group instead. the index walk in l33t_index_match
+# treats every l33t character as the set of letters it may stand for, or as
+# itself, and drops a branch as soon as the characters it has translated (or
+# kept) so far don't agree with any map of their group. every start position
+# is walked once, however many maps the full product would have had, and the
+# matches are the ones l33t_match finds, each reported once.
+def l33t_component_subs(table):
+    parent = {letter: letter for letter in table}
+
+    def find(letter):
+        while parent[letter] != letter:
+            letter = parent[letter]
+        return letter
+
+    owners = {}
+    for letter, subs in table.items():
+        for l33t_chr in subs:
+            if l33t_chr in owners:
+                parent[find(letter)] = find(owners[l33t_chr])
+            else:
+                owners[l33t_chr] = letter
+
+    groups = {}
+    for letter, subs in table.items():
+        groups.setdefault(find(letter), {})[letter] = subs
+
+    # maps each relevant l33t character to the substitution maps of its group.
+    component_subs = {}
+    for group in groups.values():
+        subs = enumerate_l33t_subs(group)
+        for letter_subs in group.values():
+            for l33t_chr in letter_subs:
+                component_subs[l33t_chr] = subs
+
+    return component_subs
 
-    matches = [match for match in matches if len(match['token']) > 1]
 
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+def _l33t_fits(assignment, l33t_chr, component_subs):
+    # True if some map of l33t_chr's group agrees with every choice made so
+    # far for the characters of that group. None means "kept as itself".
+    subs = component_subs[l33t_chr]
+    choices = [(chr, letter) for chr, letter in assignment.items()
+               if component_subs[chr] is subs]
+    for sub in subs:
+        if all(sub.get(chr) == letter for chr, letter in choices):
+            return True
+    return False
+
+
+def l33t_index_match(password, _ranked_dictionaries=RANKED_DICTIONARIES,
+                     _l33t_table=L33T_TABLE):
+    password_lower = password.lower()
+    if len(password_lower) != len(password):
+        # lowercasing changed the length, so per-character translation
+        # wouldn't line up with translate() + lower(). rare; take the slow
+        # path.
+        return l33t_match(password, _ranked_dictionaries, _l33t_table)
+
+    subtable = relevant_l33t_subtable(password, _l33t_table)
+    if not subtable:
+        return []
+
+    letters_for = {}
+    for letter, subs in subtable.items():
+        for l33t_chr in subs:
+            letters_for.setdefault(l33t_chr, []).append(letter)
+    letter_order = {letter: order for order, letter in enumerate(subtable)}
+    component_subs = l33t_component_subs(subtable)
+    index = get_dictionary_index(_ranked_dictionaries)
+
+    matches = []
+    length = len(password)
+    for i in range(length - 1):
+        stack = [(i, '', {})]
+        while stack:
+            j, word, assignment = stack.pop()
+            if j == length:
+                continue
+            char = password[j]
+            if char not in letters_for:
+                branches = [(password_lower[j], assignment)]
+            elif char in assignment:
+                letter = assignment[char]
+                branches = [(letter or password_lower[j], assignment)]
+            else:
+                branches = []
+                used = set(assignment.values())
+                for letter in letters_for[char] + [None]:
+                    if letter in used:
+                        continue
+                    extended = dict(assignment)
+                    extended[char] = letter
+                    if _l33t_fits(extended, char, component_subs):
+                        branches.append((letter or password_lower[j],
+                                         extended))
+
+            # push in reverse so branches are explored in table order.
+            for next_chr, next_assignment in reversed(branches):
+                next_word = word + next_chr
+                entries = index.get(next_word)
+                if entries is None:
+                    continue
+                stack.append((j + 1, next_word, next_assignment))
+                if not entries or j == i:
+                    continue
+                match_sub = {chr: letter for chr, letter in sorted(
+                    next_assignment.items(),
+                    key=lambda item: letter_order.get(item[1], -1))
+                    if letter}
+                if not match_sub:
+                    # only return the matches that contain an actual
+                    # substitution.
+                    continue
+                for dictionary_name, rank in entries:
+                    matches.append(MatchRecord(
+                        pattern='dictionary',
+                        i=i,
+                        j=j,
+                        token=password[i:j + 1],
+                        matched_word=next_word,
+                        rank=rank,
+                        dictionary_name=dictionary_name,
+                        reversed=False,
+                        l33t=True,
+                        sub=match_sub,
+                        sub_display=', '.join(
+                            ["%s -> %s" % (k, v) for k, v in match_sub.items()]
+                        ),
+                    ))
+
+    return sorted(matches, key=lambda x: (x.i, x.j))
 
 
 # repeats (aaa, abcabcabc) and sequences (abcdef)
@@ -283,27 +555,131 @@ def repeat_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
         )
         base_matches = base_analysis['sequence']
         base_guesses = base_analysis['guesses']
-        matches.append({
-            'pattern': 'repeat',
-            'i': i,
-            'j': j,
-            'token': match.group(0),
-            'base_token': base_token,
-            'base_guesses': base_guesses,
-            'base_matches': base_matches,
-            'repeat_count': len(match.group(0)) / len(base_token),
-        })
+        matches.append(MatchRecord(
+            pattern='repeat',
+            i=i,
+            j=j,
+            token=match.group(0),
+            base_token=base_token,
+            base_guesses=base_guesses,
+            base_matches=base_matches,
+            repeat_count=len(match.group(0)) / len(base_token),
+        ))
         last_index = j + 1
 
     return matches
 
 
+# single-pass repeat detection.
+#
+# repeat_match runs a greedy and a lazy regex search per block and a full
+# match-and-score pass per base token. _find_repeat computes both answers in
+# one scan: the leftmost position where the password starts repeating, the
+# shortest and the longest repeated unit there. analyses of base tokens are
+# kept in a bounded LRU cache shared across calls, since the same bases
+# ('ab', '123', 'love') keep coming up across a corpus.
+def _find_repeat(password, pos):
+    length = len(password)
+    for i in range(pos, length - 1):
+        # '.' in the regexes doesn't match newlines.
+        end = password.find('\n', i)
+        end = length if end == -1 else end
+        longest = (end - i) // 2
+        shortest = None
+        for size in range(1, longest + 1):
+            if password[i:i + size] == password[i + size:i + 2 * size]:
+                shortest = size
+                break
+        if shortest is None:
+            continue
+        for size in range(longest, shortest - 1, -1):
+            if password[i:i + size] == password[i + size:i + 2 * size]:
+                return i, end, shortest, size
+    return None
+
+
+def _repeat_span(password, i, end, size):
+    # i + size * copies for as many copies of password[i:i + size] as follow.
+    j = i + 2 * size
+    while j + size <= end and \
+            password[j:j + size] == password[i:i + size]:
+        j += size
+    return j
+
+
+def _shortest_period(token):
+    for size in range(1, len(token) // 2 + 1):
+        if len(token) % size == 0 and \
+                token[:size] * (len(token) // size) == token:
+            return token[:size]
+    return token
+
+
+def analyze_repeat_base(base_token):
+    with _REPEAT_BASE_LOCK:
+        cached = _REPEAT_BASE_CACHE.get(base_token)
+        if cached is not None:
+            _REPEAT_BASE_CACHE.move_to_end(base_token)
+    if cached is not None:
+        base_guesses, base_matches = cached
+    else:
+        base_analysis = most_guessable_match_sequence(
+            base_token,
+            omnimatch(base_token)
+        )
+        base_guesses = base_analysis['guesses']
+        base_matches = tuple(base_analysis['sequence'])
+        with _REPEAT_BASE_LOCK:
+            _REPEAT_BASE_CACHE[base_token] = (base_guesses, base_matches)
+            while len(_REPEAT_BASE_CACHE) > REPEAT_CACHE_SIZE:
+                _REPEAT_BASE_CACHE.popitem(last=False)
+
+    # match records are immutable, so cached analyses can be shared as-is.
+    return base_guesses, base_matches
+
+
+def repeat_scan_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
+    matches = []
+    last_index = 0
+    while last_index < len(password):
+        found = _find_repeat(password, last_index)
+        if not found:
+            break
+        i, end, shortest, longest = found
+        lazy_j = _repeat_span(password, i, end, shortest)
+        greedy_j = _repeat_span(password, i, end, longest)
+
+        if greedy_j > lazy_j:
+            # greedy beats lazy for 'aabaab'; its repeated string might
+            # itself be repeated, so take its shortest period.
+            j = greedy_j
+            base_token = _shortest_period(password[i:j])
+        else:
+            j = lazy_j
+            base_token = password[i:i + shortest]
+
+        base_guesses, base_matches = analyze_repeat_base(base_token)
+        matches.append(MatchRecord(
+            pattern='repeat',
+            i=i,
+            j=j - 1,
+            token=password[i:j],
+            base_token=base_token,
+            base_guesses=base_guesses,
+            base_matches=base_matches,
+            repeat_count=(j - i) / len(base_token),
+        ))
+        last_index = j
+
+    return matches
+
+
 def spatial_match(password, _graphs=GRAPHS, _ranked_dictionaries=RANKED_DICTIONARIES):
     matches = []
     for graph_name, graph in _graphs.items():
         matches.extend(spatial_match_helper(password, graph, graph_name))
 
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+    return sorted(matches, key=lambda x: (x.i, x.j))
 
 
 SHIFTED_RX = re.compile(r'[~!@#$%^&*()_+QWERTYUIOP{}|ASDFGHJKL:"ZXCVBNM<>?]')
@@ -360,15 +736,15 @@ def spatial_match_helper(password, graph, graph_name):
             # otherwise push the pattern discovered so far, if any...
             else:
                 if j - i > 2:  # don't consider length 1 or 2 chains.
-                    matches.append({
-                        'pattern': 'spatial',
-                        'i': i,
-                        'j': j - 1,
-                        'token': password[i:j],
-                        'graph': graph_name,
-                        'turns': turns,
-                        'shifted_count': shifted_count,
-                    })
+                    matches.append(MatchRecord(
+                        pattern='spatial',
+                        i=i,
+                        j=j - 1,
+                        token=password[i:j],
+                        graph=graph_name,
+                        turns=turns,
+                        shifted_count=shifted_count,
+                    ))
                 # ...and then start a new search for the rest of the password.
                 i = j
                 break
@@ -376,6 +752,125 @@ def spatial_match_helper(password, graph, graph_name):
     return matches
 
 
+
+# spatial match over compiled adjacency tables.
+#
+# spatial_match_helper looks each step up by scanning the neighbour strings
+# of the previous key, once per keyboard. compile_spatial_table turns every
+# graph into a direct (prev_char, cur_char) -> (direction, shifted) table,
+# taking the first direction that contains cur_char just like the scan does,
+# and stores the four keyboards side by side so spatial_table_match can
+# advance all of them in a single pass over the password.
+def compile_spatial_table(graphs):
+    graph_names = list(graphs)
+    table = {}
+    for n, graph_name in enumerate(graph_names):
+        for prev_char, adjacents in graphs[graph_name].items():
+            for direction, adj in enumerate(adjacents or []):
+                if not adj:
+                    continue
+                for shifted, cur_char in enumerate(adj):
+                    entry = table.setdefault((prev_char, cur_char),
+                                             [None] * len(graph_names))
+                    if entry[n] is None:
+                        entry[n] = (direction, shifted == 1)
+    table = {pair: tuple(entry) for pair, entry in table.items()}
+    return graph_names, table
+
+
+SPATIAL_TABLE = compile_spatial_table(GRAPHS)
+
+# tables for caller-supplied graphs, cached like custom dictionary indexes:
+# keyed by the id of the mapping, kept alive in the entry, and recompiled
+# when a graph is added, replaced or resized.
+_CUSTOM_SPATIAL_TABLES = OrderedDict()
+_CUSTOM_SPATIAL_TABLE_LOCK = threading.Lock()
+
+
+def _custom_spatial_table(graphs):
+    key = id(graphs)
+    version = _dictionaries_version(graphs)
+    with _CUSTOM_SPATIAL_TABLE_LOCK:
+        entry = _CUSTOM_SPATIAL_TABLES.get(key)
+        if entry is not None and entry[0] is graphs and entry[1] == version:
+            _CUSTOM_SPATIAL_TABLES.move_to_end(key)
+            return entry[2]
+    table = compile_spatial_table(graphs)
+    with _CUSTOM_SPATIAL_TABLE_LOCK:
+        _CUSTOM_SPATIAL_TABLES[key] = (graphs, version, table)
+        _CUSTOM_SPATIAL_TABLES.move_to_end(key)
+        while len(_CUSTOM_SPATIAL_TABLES) > CUSTOM_INDEX_CACHE_SIZE:
+            _CUSTOM_SPATIAL_TABLES.popitem(last=False)
+    return table
+
+
+def spatial_table_match(password, _graphs=GRAPHS,
+                        _ranked_dictionaries=RANKED_DICTIONARIES):
+    if _graphs is GRAPHS:
+        graph_names, table = SPATIAL_TABLE
+    else:
+        graph_names, table = _custom_spatial_table(_graphs)
+    counts_shifted_start = [graph_name in ['qwerty', 'dvorak', ]
+                            for graph_name in graph_names]
+    graph_range = range(len(graph_names))
+    length = len(password)
+    found = [[] for _ in graph_range]
+
+    def shifted_start(k):
+        return 1 if SHIFTED_RX.search(password[k]) else 0
+
+    start_shifted = shifted_start(0) if length else 0
+    # per keyboard: [i, turns, last_direction, shifted_count]
+    states = [[0, 0, None, start_shifted if counts_shifted_start[n] else 0]
+              for n in graph_range]
+
+    for k in range(1, length):
+        entry = table.get((password[k - 1], password[k]))
+        next_shifted = None
+        for n in graph_range:
+            state = states[n]
+            step = entry[n] if entry else None
+            if step is not None:
+                direction, shifted = step
+                if shifted:
+                    state[3] += 1
+                if state[2] != direction:
+                    state[1] += 1
+                    state[2] = direction
+                continue
+            i = state[0]
+            if k - i > 2:  # don't consider length 1 or 2 chains.
+                found[n].append(_spatial_match(password, i, k - 1,
+                                               graph_names[n], state))
+            if next_shifted is None:
+                next_shifted = shifted_start(k)
+            state[:] = [k, 0, None,
+                        next_shifted if counts_shifted_start[n] else 0]
+
+    for n in graph_range:
+        state = states[n]
+        if length - state[0] > 2:
+            found[n].append(_spatial_match(password, state[0], length - 1,
+                                           graph_names[n], state))
+
+    matches = []
+    for graph_matches in found:
+        matches.extend(graph_matches)
+
+    return sorted(matches, key=lambda x: (x.i, x.j))
+
+
+def _spatial_match(password, i, j, graph_name, state):
+    return MatchRecord(
+        pattern='spatial',
+        i=i,
+        j=j,
+        token=password[i:j + 1],
+        graph=graph_name,
+        turns=state[1],
+        shifted_count=state[3],
+    )
+
 MAX_DELTA = 5
 
 
@@ -411,15 +906,15 @@ def sequence_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
                 else:
                     sequence_name = 'unicode'
                     sequence_space = 26
-                result.append({
-                    'pattern': 'sequence',
-                    'i': i,
-                    'j': j,
-                    'token': password[i:j + 1],
-                    'sequence_name': sequence_name,
-                    'sequence_space': sequence_space,
-                    'ascending': delta > 0
-                })
+                result.append(MatchRecord(
+                    pattern='sequence',
+                    i=i,
+                    j=j,
+                    token=password[i:j + 1],
+                    sequence_name=sequence_name,
+                    sequence_space=sequence_space,
+                    ascending=delta > 0
+                ))
 
     result = []
     i = 0
@@ -444,16 +939,15 @@ def regex_match(password, _regexen=REGEXEN, _ranked_dictionaries=RANKED_DICTIONA
     matches = []
     for name, regex in _regexen.items():
         for rx_match in regex.finditer(password):
-            matches.append({
-                'pattern': 'regex',
-                'token': rx_match.group(0),
-                'i': rx_match.start(),
-                'j': rx_match.end()-1,
-                'regex_name': name,
-                'regex_match': rx_match,
-            })
+            matches.append(MatchRecord(
+                pattern='regex',
+                token=rx_match.group(0),
+                i=rx_match.start(),
+                j=rx_match.end()-1,
+                regex_name=name,
+            ))
 
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+    return sorted(matches, key=lambda x: (x.i, x.j))
 
 
 def date_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
@@ -517,16 +1011,16 @@ def date_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
                 distance = metric(candidate)
                 if distance < min_distance:
                     best_candidate, min_distance = candidate, distance
-            matches.append({
-                'pattern': 'date',
-                'token': token,
-                'i': i,
-                'j': j,
-                'separator': '',
-                'year': best_candidate['year'],
-                'month': best_candidate['month'],
-                'day': best_candidate['day'],
-            })
+            matches.append(MatchRecord(
+                pattern='date',
+                token=token,
+                i=i,
+                j=j,
+                separator='',
+                year=best_candidate['year'],
+                month=best_candidate['month'],
+                day=best_candidate['day'],
+            ))
 
     # dates with separators are between length 6 '1/1/91' and 10 '11/11/1991'
     for i in range(len(password) - 5):
@@ -544,16 +1038,16 @@ def date_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
             ])
             if not dmy:
                 continue
-            matches.append({
-                'pattern': 'date',
-                'token': token,
-                'i': i,
-                'j': j,
-                'separator': rx_match.group(2),
-                'year': dmy['year'],
-                'month': dmy['month'],
-                'day': dmy['day'],
-            })
+            matches.append(MatchRecord(
+                pattern='date',
+                token=token,
+                i=i,
+                j=j,
+                separator=rx_match.group(2),
+                year=dmy['year'],
+                month=dmy['month'],
+                day=dmy['day'],
+            ))
 
     # matches now contains all valid date strings in a way that is tricky to
     # capture with regexes only. while thorough, it will contain some
@@ -569,12 +1063,143 @@ def date_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
         for other in matches:
             if match == other:
                 continue
-            if other['i'] <= match['i'] and other['j'] >= match['j']:
+            if other.i <= match.i and other.j >= match.j:
                 is_submatch = True
                 break
         return not is_submatch
 
-    return sorted(filter(filter_fun, matches), key=lambda x: (x['i'], x['j']))
+    return sorted(filter(filter_fun, matches), key=lambda x: (x.i, x.j))
+
+
+# date match over digit/separator runs.
+#
+# same results as date_match, without running anchored regexes on every
+# substring: a date only ever lies inside a run of digits and separator
+# characters, so only those runs are inspected. a date without separators is
+# any 4-8 character slice of a digit run; a date with separators is built
+# around a pair of identical separators with one or two digits between them.
+# the day-month-year resolution of a token only depends on its digits, so it
+# is looked up in a bounded table shared across calls instead of being
+# re-parsed, and nested matches are dropped with one sort-and-sweep pass
+# instead of comparing every pair of matches.
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _dmy_without_separator(token):
+    candidates = []
+    for k, l in DATE_SPLITS[len(token)]:
+        dmy = map_ints_to_dmy([
+            int(token[0:k]),
+            int(token[k:l]),
+            int(token[l:])
+        ])
+        if dmy:
+            candidates.append(dmy)
+    if not candidates:
+        return None
+    # prefer the year closest to scoring.REFERENCE_YEAR, as date_match does.
+    best_candidate = min(
+        candidates,
+        key=lambda candidate: abs(candidate['year'] - scoring.REFERENCE_YEAR)
+    )
+    return best_candidate['year'], best_candidate['month'], \
+        best_candidate['day']
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _dmy_with_separator(first, second, third):
+    dmy = map_ints_to_dmy([first, second, third])
+    if not dmy:
+        return None
+    return dmy['year'], dmy['month'], dmy['day']
+
+
+def _date_run_matches(password, start, end):
+    matches = []
+
+    # dates without separators: 4-8 characters of a digit run.
+    i = start
+    while i < end:
+        if not password[i].isdecimal():
+            i += 1
+            continue
+        k = i
+        while k < end and password[k].isdecimal():
+            k += 1
+        for a in range(i, k - 3):
+            for b in range(a + 3, min(a + 8, k)):
+                token = password[a:b + 1]
+                dmy = _dmy_without_separator(token)
+                if not dmy:
+                    continue
+                matches.append(MatchRecord(
+                    pattern='date',
+                    token=token,
+                    i=a,
+                    j=b,
+                    separator='',
+                    year=dmy[0],
+                    month=dmy[1],
+                    day=dmy[2],
+                ))
+        i = k
+
+    # dates with separators: 1-4 digits, a separator, 1-2 digits, the same
+    # separator again and 1-4 digits, 6-10 characters in total.
+    separators = [k for k in range(start, end)
+                  if not password[k].isdecimal()]
+    bounds = [start - 1] + separators + [end]
+    for n in range(1, len(bounds) - 2):
+        p, q = bounds[n], bounds[n + 1]
+        if password[p] != password[q] or not 1 <= q - p - 1 <= 2:
+            continue
+        middle = int(password[p + 1:q])
+        for a in range(max(bounds[n - 1] + 1, p - 4), p):
+            for b in range(q + 1, min(bounds[n + 2], q + 5)):
+                if not 6 <= b - a + 1 <= 10:
+                    continue
+                dmy = _dmy_with_separator(
+                    int(password[a:p]),
+                    middle,
+                    int(password[q + 1:b + 1]),
+                )
+                if not dmy:
+                    continue
+                matches.append(MatchRecord(
+                    pattern='date',
+                    token=password[a:b + 1],
+                    i=a,
+                    j=b,
+                    separator=password[p],
+                    year=dmy[0],
+                    month=dmy[1],
+                    day=dmy[2],
+                ))
+
+    return matches
+
+
+def date_run_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
+    if '\n' in password:
+        # date_match's '$' anchors also match before a trailing newline;
+        # keep its exact behaviour for these.
+        return date_match(password, _ranked_dictionaries)
+
+    matches = []
+    for run in DATE_RUN_RX.finditer(password):
+        if run.end() - run.start() >= 4:
+            matches.extend(_date_run_matches(password, *run.span()))
+
+    # no two date matches share a span. ordered by i and then longest first,
+    # a match is a strict substring of another exactly when an earlier match
+    # reaches at least as far right.
+    matches.sort(key=lambda x: (x.i, -x.j))
+    result = []
+    reach = -1
+    for match in matches:
+        if match.j > reach:
+            result.append(match)
+            reach = match.j
+
+    return result
 
 
 def map_ints_to_dmy(ints):
@@ -1,11 +1,14 @@
-from math import log, factorial
+from math import log, log10, factorial, lgamma
 
+import functools
 import re
 
 from .adjacency_graphs import ADJACENCY_GRAPHS
 
 from decimal import Decimal
 
+from pwstrength.adapters.match_record import MatchRecord
+
 
 def calc_average_degree(graph):
     average = 0
@@ -25,6 +28,8 @@ MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
 MIN_YEAR_SPACE = 20
 REFERENCE_YEAR = 2017
 
+COMBINATORICS_CACHE_SIZE = 4096
+
 
 def nCk(n, k):
     """http://blog.plover.com/math/choose.html"""
@@ -42,6 +47,31 @@ def nCk(n, k):
     return r
 
 
+# the variation counts below only depend on a few small integers (token
+# length, turns, shifted/upper/lower/subbed counts), so their nCk sums are
+# memoized on those integers. the sums are computed in the same order as
+# before, so cached values are bit-identical to recomputing them.
+@functools.lru_cache(maxsize=COMBINATORICS_CACHE_SIZE)
+def variations_sum(n, p):
+    # Sum(nCk(n, i) for i in [1..p])
+    variations = 0
+    for i in range(1, p + 1):
+        variations += nCk(n, i)
+    return variations
+
+
+@functools.lru_cache(maxsize=COMBINATORICS_CACHE_SIZE)
+def spatial_pattern_count(s, d, L, t):
+    # number of possible patterns w/ length L or less with t turns or less,
+    # for s starting positions and an average degree of d.
+    guesses = 0
+    for i in range(2, L + 1):
+        possible_turns = min(t, i - 1) + 1
+        for j in range(1, possible_turns):
+            guesses += nCk(i - 1, j - 1) * s * pow(d, j)
+    return guesses
+
+
 # ------------------------------------------------------------------------------
 # search --- most guessable match sequence -------------------------------------
 # ------------------------------------------------------------------------------
@@ -77,16 +107,23 @@ def nCk(n, k):
 def most_guessable_match_sequence(password, matches, _exclude_additive=False):
     n = len(password)
 
-    # partition matches into sublists according to ending index j
+    # partition matches into sublists according to ending index j. match
+    # records are immutable, so each one is annotated with its guesses once,
+    # up front, instead of being updated in place by estimate_guesses. the
+    # annotated matches are returned in their original order as well, for
+    # callers such as feedback that look at more than the optimal sequence.
     matches_by_j = [[] for _ in range(n)]
+    annotated = []
     try:
         for m in matches:
-            matches_by_j[m['j']].append(m)
+            m = estimate_match(m, password)
+            annotated.append(m)
+            matches_by_j[m.j].append(m)
     except TypeError:
         pass
     # small detail: for deterministic output, sort each sublist by i.
     for lst in matches_by_j:
-        lst.sort(key=lambda m1: m1['i'])
+        lst.sort(key=lambda m1: m1.i)
 
     optimal = {
         # optimal.m[k][l] holds final match in the best length-l match sequence
@@ -105,18 +142,27 @@ def most_guessable_match_sequence(password, matches, _exclude_additive=False):
         'g': [{} for _ in range(n)],
     }
 
+    # bruteforce matches are (i, j) spans until they make it into the final
+    # sequence; their guesses only depend on the span length.
+    bruteforce_pi = [Decimal(guesses)
+                     for guesses in bruteforce_span_guesses(n)]
+
     # helper: considers whether a length-l sequence ending at match m is better
     # (fewer guesses) than previously encountered sequences, updating state if
     # so.
     def update(m, l):
-        k = m['j']
-        pi = estimate_guesses(m, password)
+        if isinstance(m, tuple):
+            i, k = m
+            pi = bruteforce_pi[k - i + 1]
+        else:
+            i, k = m.i, m.j
+            pi = Decimal(m.guesses)
         if l > 1:
             # we're considering a length-l sequence ending with match m:
             # obtain the product term in the minimization function by
             # multiplying m's guesses by the product of the length-(l-1)
             # sequence ending just before m, at m.i - 1.
-            pi = pi * Decimal(optimal['pi'][m['i'] - 1][l - 1])
+            pi = pi * Decimal(optimal['pi'][i - 1][l - 1])
         # calculate the minimization func
         g = factorial(l) * pi
         if not _exclude_additive:
@@ -140,13 +186,12 @@ def most_guessable_match_sequence(password, matches, _exclude_additive=False):
     # helper: evaluate bruteforce matches ending at k.
     def bruteforce_update(k):
         # see if a single bruteforce match spanning the k-prefix is optimal.
-        m = make_bruteforce_match(0, k)
-        update(m, 1)
+        update((0, k), 1)
         for i in range(1, k + 1):
-            # generate k bruteforce matches, spanning from (i=1, j=k) up to
-            # (i=k, j=k). see if adding these new matches to any of the
-            # sequences in optimal[i-1] leads to new bests.
-            m = make_bruteforce_match(i, k)
+            # consider k bruteforce spans, from (i=1, j=k) up to (i=k, j=k).
+            # see if adding these new spans to any of the sequences in
+            # optimal[i-1] leads to new bests.
+            m = (i, k)
             for l, last_m in optimal['m'][i - 1].items():
                 l = int(l)
 
@@ -155,21 +200,12 @@ def most_guessable_match_sequence(password, matches, _exclude_additive=False):
                 # bruteforce match spanning the same region: same contribution
                 # to the guess product with a lower length.
                 # --> safe to skip those cases.
-                if last_m.get('pattern', False) == 'bruteforce':
+                if isinstance(last_m, tuple):
                     continue
 
                 # try adding m to this length-l sequence.
                 update(m, l + 1)
 
-    # helper: make bruteforce match objects spanning i to j, inclusive.
-    def make_bruteforce_match(i, j):
-        return {
-            'pattern': 'bruteforce',
-            'token': password[i:j + 1],
-            'i': i,
-            'j': j,
-        }
-
     # helper: step backwards through optimal.m starting at the end,
     # constructing the final optimal match sequence.
     def unwind(n):
@@ -185,16 +221,18 @@ def most_guessable_match_sequence(password, matches, _exclude_additive=False):
 
         while k >= 0:
             m = optimal['m'][k][l]
+            if isinstance(m, tuple):
+                m = make_bruteforce_match(password, *m)
             optimal_match_sequence.insert(0, m)
-            k = m['i'] - 1
+            k = m.i - 1
             l -= 1
 
         return optimal_match_sequence
 
     for k in range(n):
         for m in matches_by_j[k]:
-            if m['i'] > 0:
-                for l in optimal['m'][m['i'] - 1]:
+            if m.i > 0:
+                for l in optimal['m'][m.i - 1]:
                     l = int(l)
                     update(m, l + 1)
             else:
@@ -216,12 +254,156 @@ def most_guessable_match_sequence(password, matches, _exclude_additive=False):
         'guesses': guesses,
         'guesses_log10': log(guesses, 10),
         'sequence': optimal_match_sequence,
+        'matches': annotated,
+    }
+
+
+# ------------------------------------------------------------------------------
+# search --- float log-space variant ------------------------------------------
+# ------------------------------------------------------------------------------
+#
+# same search as most_guessable_match_sequence, but every guess count, product
+# term and minimization value is kept as a float log10 instead of a Decimal,
+# in per-position arrays allocated once up front:
+#
+#    log10(g) = log10(l! * Product(m.guesses) + D^(l - 1))
+#             = logsumexp10(log10(l!) + Sum(m.guesses_log10), (l - 1) * log10(D))
+#
+# bruteforce spans are scored from a per-length table and only turned into
+# match records if they end up in the returned sequence.
+#
+# tolerance: guesses_log10 agrees with the Decimal search to within
+# LOG_SEARCH_TOLERANCE. the optimal sequence is the same unless two competing
+# sequences differ by less than that in log10 guesses, where rounding may
+# break the tie the other way; their guess counts are then equal to within
+# the same tolerance anyway.
+# ------------------------------------------------------------------------------
+LOG_SEARCH_TOLERANCE = 1e-9
+
+
+def _log10_sum(a, b):
+    # log10(10^a + 10^b) without leaving log space.
+    if a < b:
+        a, b = b, a
+    return a + log10(1 + 10 ** (b - a))
+
+
+def most_guessable_match_sequence_log(password, matches,
+                                      _exclude_additive=False):
+    n = len(password)
+    if n == 0:
+        # corner: empty password
+        return {
+            'password': password,
+            'guesses': 1,
+            'guesses_log10': 0.0,
+            'sequence': [],
+            'matches': [],
+        }
+
+    matches_by_j = [[] for _ in range(n)]
+    annotated = []
+    try:
+        for m in matches:
+            m = estimate_match(m, password)
+            annotated.append(m)
+            matches_by_j[m.j].append(m)
+    except TypeError:
+        pass
+    for lst in matches_by_j:
+        lst.sort(key=lambda m1: m1.i)
+
+    # per position k and sequence length l (1..n): log10 g, log10 pi and the
+    # final match, which is either a match record or an (i, j) bruteforce
+    # span. lengths[k] lists the l set at k, in the order they were first set.
+    log_g = [[float('inf')] * (n + 1) for _ in range(n)]
+    log_pi = [[0.0] * (n + 1) for _ in range(n)]
+    last = [[None] * (n + 1) for _ in range(n)]
+    lengths = [[] for _ in range(n)]
+
+    log_factorial = [lgamma(l + 1) / log(10) for l in range(n + 1)]
+    log_additive = [(l - 1) * log10(MIN_GUESSES_BEFORE_GROWING_SEQUENCE)
+                    for l in range(n + 1)]
+
+    log_bruteforce = [log10(guesses) if guesses else 0.0
+                      for guesses in bruteforce_span_guesses(n)]
+
+    def update(k, i, m, m_log10, l):
+        pi = m_log10
+        if l > 1:
+            pi += log_pi[i - 1][l - 1]
+        g = log_factorial[l] + pi
+        if not _exclude_additive:
+            g = _log10_sum(g, log_additive[l])
+
+        g_k = log_g[k]
+        for competing_l in lengths[k]:
+            if competing_l > l:
+                continue
+            if g_k[competing_l] <= g:
+                return
+
+        if g_k[l] == float('inf'):
+            lengths[k].append(l)
+        g_k[l] = g
+        last[k][l] = m
+        log_pi[k][l] = pi
+
+    for k in range(n):
+        for m in matches_by_j[k]:
+            if m.i > 0:
+                for l in lengths[m.i - 1]:
+                    update(k, m.i, m, m.guesses_log10, l + 1)
+            else:
+                update(k, 0, m, m.guesses_log10, 1)
+
+        # bruteforce spans ending at k; never two adjacent bruteforce spans.
+        update(k, 0, (0, k), log_bruteforce[k + 1], 1)
+        for i in range(1, k + 1):
+            span_log10 = log_bruteforce[k - i + 1]
+            for l in lengths[i - 1]:
+                if isinstance(last[i - 1][l], tuple):
+                    continue
+                update(k, i, (i, k), span_log10, l + 1)
+
+    # unwind from the end, as most_guessable_match_sequence does.
+    k = n - 1
+    optimal_l = None
+    best = float('inf')
+    for candidate_l in lengths[k]:
+        if log_g[k][candidate_l] < best:
+            optimal_l = candidate_l
+            best = log_g[k][candidate_l]
+
+    sequence = []
+    l = optimal_l
+    while k >= 0:
+        m = last[k][l]
+        if isinstance(m, tuple):
+            m = make_bruteforce_match(password, *m)
+        sequence.insert(0, m)
+        k = m.i - 1
+        l -= 1
+
+    return {
+        'password': password,
+        'guesses': 10 ** best if best < 308 else float('inf'),
+        'guesses_log10': best,
+        'sequence': sequence,
+        'matches': annotated,
     }
 
 
 def estimate_guesses(match, password):
+    return Decimal(estimate_match(match, password)['guesses'])
+
+
+# returns match annotated with its guesses (and, for dictionary matches, the
+# variation counts kept for display purposes). already annotated matches are
+# returned unchanged.
+def estimate_match(match, password):
     if match.get('guesses', False):
-        return Decimal(match['guesses'])
+        return match
 
     min_guesses = 1
     if len(match['token']) < len(password):
@@ -240,19 +422,48 @@ def estimate_guesses(match, password):
         'date': date_guesses,
     }
 
-    guesses = estimation_functions[match['pattern']](match)
-    match['guesses'] = max(guesses, min_guesses)
-    match['guesses_log10'] = log(match['guesses'], 10)
+    properties = {}
+    if match['pattern'] == 'dictionary':
+        properties = dictionary_properties(match)
+        guesses = dictionary_guesses(match, properties)
+    else:
+        guesses = estimation_functions[match['pattern']](match)
+    guesses = max(guesses, min_guesses)
 
-    return Decimal(match['guesses'])
+    return match.replace(
+        guesses=guesses,
+        guesses_log10=log(guesses, 10),
+        **properties
+    )
 
 
 def bruteforce_guesses(match):
-    guesses = BRUTEFORCE_CARDINALITY ** len(match['token'])
+    return bruteforce_length_guesses(len(match['token']))
+
+
+# make a scored bruteforce match object spanning i to j, inclusive.
+def make_bruteforce_match(password, i, j):
+    return estimate_match(MatchRecord(
+        pattern='bruteforce',
+        token=password[i:j + 1],
+        i=i,
+        j=j,
+    ), password)
+
+
+# guesses of every bruteforce span of a length-n password, by span length.
+# bruteforce guesses already exceed the submatch minimums estimate_match
+# applies, so these equal the guesses of the matching bruteforce match.
+def bruteforce_span_guesses(n):
+    return [0] + [bruteforce_length_guesses(size) for size in range(1, n + 1)]
+
+
+def bruteforce_length_guesses(length):
+    guesses = BRUTEFORCE_CARDINALITY ** length
     # small detail: make bruteforce matches at minimum one guess bigger than
     # smallest allowed submatch guesses, such that non-bruteforce submatches
     # over the same [i..j] take precedence.
-    if len(match['token']) == 1:
+    if length == 1:
         min_guesses = MIN_SUBMATCH_GUESSES_SINGLE_CHAR + 1
     else:
         min_guesses = MIN_SUBMATCH_GUESSES_MULTI_CHAR + 1
@@ -260,15 +471,21 @@ def bruteforce_guesses(match):
     return max(guesses, min_guesses)
 
 
-def dictionary_guesses(match):
+def dictionary_properties(match):
     # keep these as properties for display purposes
-    match['base_guesses'] = match['rank']
-    match['uppercase_variations'] = uppercase_variations(match)
-    match['l33t_variations'] = l33t_variations(match)
+    return {
+        'base_guesses': match['rank'],
+        'uppercase_variations': uppercase_variations(match),
+        'l33t_variations': l33t_variations(match),
+    }
+
+
+def dictionary_guesses(match, properties=None):
+    properties = properties or dictionary_properties(match)
     reversed_variations = match.get('reversed', False) and 2 or 1
 
-    return match['base_guesses'] * match['uppercase_variations'] * \
-        match['l33t_variations'] * reversed_variations
+    return properties['base_guesses'] * properties['uppercase_variations'] * \
+        properties['l33t_variations'] * reversed_variations
 
 
 def repeat_guesses(match):
@@ -309,7 +526,7 @@ def regex_guesses(match):
         # conservative estimate of year space: num years from REFERENCE_YEAR.
         # if year is close to REFERENCE_YEAR, estimate a year space of
         # MIN_YEAR_SPACE.
-        year_space = abs(int(match['regex_match'].group(0)) - REFERENCE_YEAR)
+        year_space = abs(int(match['token']) - REFERENCE_YEAR)
         year_space = max(year_space, MIN_YEAR_SPACE)
 
         return year_space
@@ -339,15 +556,11 @@ def spatial_guesses(match):
     else:
         s = KEYPAD_STARTING_POSITIONS
         d = KEYPAD_AVERAGE_DEGREE
-    guesses = 0
     L = len(match['token'])
     t = match['turns']
     # estimate the number of possible patterns w/ length L or less with t turns
     # or less.
-    for i in range(2, L + 1):
-        possible_turns = min(t, i - 1) + 1
-        for j in range(1, possible_turns):
-            guesses += nCk(i - 1, j - 1) * s * pow(d, j)
+    guesses = spatial_pattern_count(s, d, L, t)
     # add extra guesses for shifted keys. (% instead of 5, A instead of a.)
     # math is similar to extra guesses of l33t substitutions in dictionary
     # matches.
@@ -357,10 +570,7 @@ def spatial_guesses(match):
         if S == 0 or U == 0:
             guesses *= 2
         else:
-            shifted_variations = 0
-            for i in range(1, min(S, U) + 1):
-                shifted_variations += nCk(S + U, i)
-            guesses *= shifted_variations
+            guesses *= variations_sum(S + U, min(S, U))
 
     return guesses
 
@@ -383,11 +593,8 @@ def uppercase_variations(match):
 
     U = sum(1 for c in word if c.isupper())
     L = sum(1 for c in word if c.islower())
-    variations = 0
-    for i in range(1, min(U, L) + 1):
-        variations += nCk(U + L, i)
 
-    return variations
+    return variations_sum(U + L, min(U, L))
 
 
 def l33t_variations(match):
@@ -412,9 +619,6 @@ def l33t_variations(match):
             # with aa44a, U = 3, S = 2, attacker needs to try unsubbed + one
             # sub + two subs
             p = min(U, S)
-            possibilities = 0
-            for i in range(1, p + 1):
-                possibilities += nCk(U + S, i)
-            variations *= possibilities
+            variations *= variations_sum(U + S, p)
 
     return variations
@@ -1,20 +1,28 @@
 from decimal import Decimal, Context, Inexact
 
-def estimate_attack_times(guesses):
-    crack_times_seconds = {
-        'online_throttling_100_per_hour': Decimal(guesses) / float_to_decimal(100.0 / 3600.0),
-        'online_no_throttling_10_per_second': Decimal(guesses) / float_to_decimal(10.0),
-        'offline_slow_hashing_1e4_per_second': Decimal(guesses) / float_to_decimal(1e4),
-        'offline_fast_hashing_1e10_per_second': Decimal(guesses) / float_to_decimal(1e10),
-    }
+import numpy as np
+
+# guesses per second for each attack scenario.
+ATTACK_SCENARIOS = {
+    'online_throttling_100_per_hour': 100.0 / 3600.0,
+    'online_no_throttling_10_per_second': 10.0,
+    'offline_slow_hashing_1e4_per_second': 1e4,
+    'offline_fast_hashing_1e10_per_second': 1e10,
+}
 
-    crack_times_display = {}
-    for scenario, seconds in crack_times_seconds.items():
-        crack_times_display[scenario] = display_time(seconds)
 
+def estimate_attack_times(guesses):
+    # single-value wrapper around estimate_attack_times_batch.
+    batch = estimate_attack_times_batch([guesses])
     return {
-        'crack_times_seconds': crack_times_seconds,
-        'crack_times_display': crack_times_display,
+        'crack_times_seconds': {
+            scenario: float(seconds[0])
+            for scenario, seconds in batch['crack_times_seconds'].items()
+        },
+        'crack_times_display': {
+            scenario: str(display[0])
+            for scenario, display in batch['crack_times_display'].items()
+        },
         'score': guesses_to_score(guesses),
     }
 
@@ -88,4 +96,99 @@ def float_to_decimal(f):
         ctx.flags[Inexact] = False
         ctx.prec *= 2
         result = ctx.divide(numerator, denominator)
-    return result
\ No newline at end of file
+    return result
+
+
+# ------------------------------------------------------------------------------
+# batch crack times ------------------------------------------------------------
+# ------------------------------------------------------------------------------
+#
+# estimate_attack_times_batch computes float64 seconds for every scenario with
+# one array division against rates converted once, and picks display_time's
+# unit and count with array operations instead of formatting one value at a
+# time.
+#
+# display_time used to see exact Decimal quotients. a float quotient can land
+# on the other side of a unit boundary or of a .5 rounding tie (250 guesses at
+# 100/hour is a hair over 2.5 hours, and rounds to 3), so the few values that
+# sit within float error of one are re-displayed from the exact Decimal
+# quotient. displays are therefore identical to the Decimal computation.
+SCENARIO_RATES = np.array(list(ATTACK_SCENARIOS.values()))
+SCENARIO_DECIMAL_RATES = [float_to_decimal(rate)
+                          for rate in ATTACK_SCENARIOS.values()]
+
+_MINUTE = 60
+_HOUR = _MINUTE * 60
+_DAY = _HOUR * 24
+_MONTH = _DAY * 31
+_YEAR = _MONTH * 12
+_CENTURY = _YEAR * 100
+# unit k covers DISPLAY_BOUNDS[k - 1] <= seconds < DISPLAY_BOUNDS[k]; unit 0
+# is 'less than a second' and the last unit is 'centuries'.
+DISPLAY_BOUNDS = np.array([1, _MINUTE, _HOUR, _DAY, _MONTH, _YEAR, _CENTURY],
+                          dtype=float)
+DISPLAY_DIVISORS = np.array([1, 1, _MINUTE, _HOUR, _DAY, _MONTH, _YEAR, 1],
+                            dtype=float)
+DISPLAY_UNITS = np.array(['', ' second', ' minute', ' hour', ' day', ' month',
+                          ' year', ''])
+_BOUNDARY_TOLERANCE = 1e-9
+
+
+def estimate_attack_times_batch(guesses):
+    values = list(guesses)
+    guess_array = np.asarray(values, dtype=float).reshape(-1)
+    seconds = guess_array[:, None] / SCENARIO_RATES[None, :]
+
+    crack_times_seconds = {}
+    crack_times_display = {}
+    for n, scenario in enumerate(ATTACK_SCENARIOS):
+        column = seconds[:, n]
+        crack_times_seconds[scenario] = column
+        display = _display_times(column)
+        for k in np.flatnonzero(_near_display_boundary(column)):
+            display[k] = display_time(
+                Decimal(values[k]) / SCENARIO_DECIMAL_RATES[n])
+        crack_times_display[scenario] = display
+
+    return {
+        'crack_times_seconds': crack_times_seconds,
+        'crack_times_display': crack_times_display,
+        'score': guesses_to_score_batch(guess_array),
+    }
+
+
+def guesses_to_score_batch(guesses):
+    # same thresholds as guesses_to_score.
+    delta = 5
+    bounds = np.array([1e3 + delta, 1e6 + delta, 1e8 + delta, 1e10 + delta])
+    return np.searchsorted(bounds, np.asarray(guesses, dtype=float),
+                           side='right')
+
+
+def _display_units(seconds):
+    return np.searchsorted(DISPLAY_BOUNDS, seconds, side='right')
+
+
+def _display_times(seconds):
+    units = _display_units(seconds)
+    counted = (units > 0) & (units < len(DISPLAY_UNITS) - 1)
+    base = np.where(counted,
+                    np.round(np.where(counted, seconds, 1.0)
+                             / DISPLAY_DIVISORS[units]),
+                    1).astype(np.int64)
+    text = np.char.add(np.char.add(base.astype(str), DISPLAY_UNITS[units]),
+                       np.where(base != 1, 's', ''))
+    text = np.where(units == 0, 'less than a second', text)
+    text = np.where(units == len(DISPLAY_UNITS) - 1, 'centuries', text)
+    return text.astype(object)
+
+
+def _near_display_boundary(seconds):
+    # within float error of a unit boundary or of a rounding tie.
+    lower = _display_units(seconds * (1 - _BOUNDARY_TOLERANCE))
+    upper = _display_units(seconds * (1 + _BOUNDARY_TOLERANCE))
+    units = _display_units(seconds)
+    with np.errstate(invalid='ignore'):
+        scaled = seconds / DISPLAY_DIVISORS[units]
+        tie = np.abs(scaled - np.floor(scaled) - 0.5) < _BOUNDARY_TOLERANCE
+    return (lower != upper) | tie
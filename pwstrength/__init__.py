@@ -3,7 +3,7 @@
 from importlib import import_module
 from typing import Any
 
-__all__ = ["ScoreResult", "build_features", "score"]
+__all__ = ["ScoreResult", "build_features", "iter_features", "score", "score_record"]
 
 
 def __getattr__(name: str) -> Any:
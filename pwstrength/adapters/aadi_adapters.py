@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import importlib.util
+import os
 import pathlib
 import sys
+import threading
 from types import ModuleType
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
+from .match_record import MatchRecord
 
 BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
 STUDENT_DIR = BASE_DIR / "password-py"
@@ -31,42 +34,120 @@ def _import_from_student(module_suffix: str, filename: str) -> ModuleType:
         raise ImportError(f"Unable to load spec for {qualified_name}")
     module = importlib.util.module_from_spec(spec)
     sys.modules[qualified_name] = module
-    spec.loader.exec_module(module)
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[qualified_name]
+        raise
     return module
 
 
-def _student_modules() -> Dict[str, ModuleType]:
-    adjacency = _import_from_student("adjacency_graphs", "Adjacency Graphs.py")
-    matching = _import_from_student("matching_script", "Matching Script.py")
-    scoring = _import_from_student("scoring_script", "Scoring Script.py")
-    time_estimates = _import_from_student("time_estimates", "Time Estimates.py")
-    feedback = _import_from_student("feedback", "Feedback.py")
-    return {
-        "adjacency": adjacency,
-        "matching": matching,
-        "scoring": scoring,
-        "time": time_estimates,
-        "feedback": feedback,
-    }
+# name -> (module suffix, file, scripts it imports from the pseudo-package).
+# The matching script scores repeat base tokens with the scoring script.
+STUDENT_SCRIPTS: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "adjacency": ("adjacency_graphs", "Adjacency Graphs.py", ()),
+    "scoring": ("scoring_script", "Scoring Script.py", ("adjacency",)),
+    "matching": ("matching_script", "Matching Script.py", ("adjacency", "scoring")),
+    "time": ("time_estimates", "Time Estimates.py", ()),
+    "feedback": ("feedback", "Feedback.py", ()),
+}
+# Path of a prebuilt dictionary index to memory-map when the matching script
+# loads; see pwstrength.adapters.dictionary_index.
+DICTIONARY_INDEX_ENV = "PWSTRENGTH_DICTIONARY_INDEX"
+_LOAD_LOCK = threading.RLock()
+_LOADED: Dict[str, ModuleType] = {}
+
+
+class _StudentModules(Mapping[str, ModuleType]):
+    """Executes each student script on first access.
+
+    The matching script builds the ranked dictionaries when it runs, so
+    importing this adapter stays cheap until a match is requested.
+    """
+
+    def __getitem__(self, name: str) -> ModuleType:
+        module = _LOADED.get(name)
+        if module is not None:
+            return module
+        module_suffix, filename, requires = STUDENT_SCRIPTS[name]
+        with _LOAD_LOCK:
+            if name not in _LOADED:
+                for dependency in requires:
+                    self[dependency]
+                module = _import_from_student(module_suffix, filename)
+                # Published only once set up: the unlocked fast path above must
+                # never hand out a matching module without its index.
+                if name == "matching" and os.environ.get(DICTIONARY_INDEX_ENV):
+                    _install_dictionary_index(module, os.environ[DICTIONARY_INDEX_ENV])
+                _LOADED[name] = module
+            return _LOADED[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(STUDENT_SCRIPTS)
+
+    def __len__(self) -> int:
+        return len(STUDENT_SCRIPTS)
+
+
+MODULES: Mapping[str, ModuleType] = _StudentModules()
+
+
+def use_dictionary_index(path: str) -> None:
+    """Serve dictionary lookups from a prebuilt index file instead of building one."""
+    _install_dictionary_index(MODULES["matching"], path)
+
 
+def _install_dictionary_index(matching: ModuleType, path: str) -> None:
+    from .dictionary_index import MappedDictionaryIndex
 
-MODULES = _student_modules()
+    index = MappedDictionaryIndex(path)
+    if not index.matches_lists(matching.RANKED_DICTIONARIES):
+        raise ValueError(f"{path} was built from different frequency lists; rebuild it")
+    matching.set_dictionary_index(index)
 
 
-def match_patterns(password: str) -> List[Dict[str, Any]]:
+def warm_up() -> None:
+    """Load every student script and build the dictionary index now."""
+    for name in MODULES:
+        MODULES[name]
+    MODULES["matching"].get_dictionary_index()
+
+
+def match_patterns(password: str) -> List[MatchRecord]:
     """Return the list of pattern matches from Aadi's matching script."""
     return MODULES["matching"].omnimatch(password)
 
 
-def estimate_guesses(password: str, matches: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
-    """Estimate guesses using the original scorer."""
+SEARCH_ENGINES = {
+    "decimal": "most_guessable_match_sequence",
+    "log": "most_guessable_match_sequence_log",
+}
+
+
+def estimate_guesses(
+    password: str,
+    matches: Optional[List[MatchRecord]] = None,
+    engine: str = "decimal",
+) -> Dict[str, Any]:
+    """Estimate guesses using the original scorer.
+
+    ``engine="log"`` runs the float log-space search instead of the Decimal
+    one; see ``LOG_SEARCH_TOLERANCE`` in the scoring script for how closely
+    the two agree. ``matches`` in the result holds the input matches
+    annotated with their guesses, in input order; pass it on to
+    :func:`human_feedback`.
+    """
+    if engine not in SEARCH_ENGINES:
+        raise ValueError(f"Unknown search engine {engine!r}; expected one of {sorted(SEARCH_ENGINES)}")
     matches = matches or match_patterns(password)
-    result = MODULES["scoring"].most_guessable_match_sequence(password, matches)
+    search = getattr(MODULES["scoring"], SEARCH_ENGINES[engine])
+    result = search(password, matches)
     guesses = result["guesses"]
     score = MODULES["time"].guesses_to_score(float(guesses))
     return {
         "password": password,
         "sequence": result["sequence"],
+        "matches": result["matches"],
         "guesses": float(guesses),
         "guesses_log10": result["guesses_log10"],
         "score": score,
@@ -78,18 +159,49 @@ def crack_times(guesses: float) -> Dict[str, Any]:
     return MODULES["time"].estimate_attack_times(guesses)
 
 
+def crack_times_batch(guesses: Iterable[float]) -> Dict[str, Any]:
+    """Return crack time arrays (seconds, display strings, score) per scenario."""
+    return MODULES["time"].estimate_attack_times_batch(guesses)
+
+
 def human_feedback(
     password: str,
-    matches: Optional[List[Dict[str, Any]]] = None,
+    matches: Optional[List[MatchRecord]] = None,
     score: Optional[int] = None,
 ) -> str:
     """Return a human-facing feedback string."""
     matches = matches or match_patterns(password)
     if score is None:
-        score = estimate_guesses(password, matches)["score"]
+        guess_info = estimate_guesses(password, matches)
+        matches, score = guess_info["matches"], guess_info["score"]
+    # Match records are immutable, so raw matches carry no guesses; the
+    # feedback rules need them for dictionary matches. Annotated matches from
+    # estimate_guesses pass through, anything else is scored here.
+    scoring = MODULES["scoring"]
+    matches = [match if "guesses_log10" in match else scoring.estimate_match(match, password) for match in matches]
+    # get_feedback treats a one-item list as a sole match and warns about the
+    # first of the longest matches. Each distinct l33t match is listed once,
+    # so a lone one such as "is" in "(7e!$y" now gets the "word by itself"
+    # warning that per-map duplicates used to suppress, and same-span words
+    # come in index order ("lail" before "tail" in "7@1l1l").
     feedback = MODULES["feedback"].get_feedback(score, matches)
     warning = feedback.get("warning", "")
     suggestions = feedback.get("suggestions", []) or []
     segments = [warning] if warning else []
     segments.extend(suggestions)
     return " ".join(s for s in segments if s)
+
+
+def zxcvbn_result(guess_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a zxcvbn-style result built from an ``estimate_guesses`` result.
+
+    The student scripts port zxcvbn's matchers, scorer and feedback, so the
+    score, guesses and feedback match ``zxcvbn.zxcvbn`` for the same password
+    without running zxcvbn's own match pass. Unlike the package, there is no
+    72-character limit.
+    """
+    return {
+        "score": guess_info["score"],
+        "guesses": guess_info["guesses"],
+        "feedback": MODULES["feedback"].get_feedback(guess_info["score"], guess_info["sequence"]),
+    }
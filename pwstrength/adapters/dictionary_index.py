@@ -0,0 +1,199 @@
+"""Prebuilt, memory-mapped dictionary index for the matching script.
+
+``build_dictionary_index`` in the matching script turns the ranked frequency
+lists into a hash trie: each word maps to its ``(dictionary_name, rank)``
+entries and each proper prefix maps to ``()``. Building it takes about half a
+second and every process keeps its own copy. ``write_index_file`` stores the
+same mapping as an open-addressing hash table in one file, and
+``MappedDictionaryIndex`` answers ``index.get(key)`` from a read-only mmap of
+it, so processes share the pages and start without building anything.
+
+Build the file once per zxcvbn release::
+
+    python -m pwstrength.adapters.dictionary_index data/dictionary.idx
+
+and point ``PWSTRENGTH_DICTIONARY_INDEX`` at it (or call
+``aadi_adapters.use_dictionary_index``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+MAGIC = b"PWIDX001"
+# magic, byte order, metadata length, key count, slot count, entry count
+_HEADER = struct.Struct("<8s8sIIII")
+_RANK_BITS = 24
+_RANK_MASK = (1 << _RANK_BITS) - 1
+
+Entries = Tuple[Tuple[str, int], ...]
+
+
+def _key_hash(key: bytes) -> int:
+    return zlib.crc32(key)
+
+
+def _encode(key: str) -> bytes:
+    return key.encode("utf-8", "surrogatepass")
+
+
+def _uint32_array(values: Iterable[int]) -> array:
+    result = array("I", values)
+    if result.itemsize != 4:  # pragma: no cover
+        raise RuntimeError("array('I') is not 32-bit on this platform")
+    return result
+
+
+def write_index_file(
+    path: str,
+    index: Mapping[str, Entries],
+    ranked_dictionaries: Mapping[str, Mapping[str, int]],
+) -> None:
+    """Write ``index`` (as built by ``build_dictionary_index``) to ``path``.
+
+    ``ranked_dictionaries`` names the dictionaries, in entry order, and records
+    their sizes so a loader can tell when the lists have changed.
+    """
+    names = list(ranked_dictionaries)
+    if len(names) > 256:
+        raise ValueError("at most 256 dictionaries fit in an index file")
+    name_ids = {name: number for number, name in enumerate(names)}
+
+    keys = [_encode(key) for key in index]
+    slot_count = 1
+    while slot_count < 2 * max(len(keys), 1):
+        slot_count *= 2
+    mask = slot_count - 1
+
+    slots = _uint32_array([0]) * slot_count
+    key_offsets = _uint32_array([0])
+    entry_offsets = _uint32_array([0])
+    packed_entries = _uint32_array([])
+    blob = bytearray()
+    for number, (key, entries) in enumerate(zip(keys, index.values())):
+        slot = _key_hash(key) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = number + 1
+        blob += key
+        key_offsets.append(len(blob))
+        for dictionary_name, rank in entries:
+            if rank > _RANK_MASK:
+                raise ValueError(f"rank {rank} does not fit in {_RANK_BITS} bits")
+            packed_entries.append(rank << 8 | name_ids[dictionary_name])
+        entry_offsets.append(len(packed_entries))
+
+    metadata = json.dumps(
+        {"dictionaries": [[name, len(ranked_dictionaries[name])] for name in names]}
+    ).encode("utf-8")
+    header = _HEADER.pack(
+        MAGIC, sys.byteorder.encode("ascii"), len(metadata), len(keys), slot_count, len(packed_entries)
+    )
+    with open(path, "wb") as handle:
+        handle.write(header)
+        handle.write(metadata)
+        # keep the uint32 sections 4-byte aligned for memoryview.cast
+        handle.write(b"\0" * (-(len(header) + len(metadata)) % 4))
+        for section in (slots, key_offsets, entry_offsets, packed_entries):
+            section.tofile(handle)
+        handle.write(blob)
+
+
+class MappedDictionaryIndex:
+    """Read-only dictionary index backed by an mmap of a ``write_index_file`` file.
+
+    ``get`` returns what the in-memory index holds for the key: a tuple of
+    ``(dictionary_name, rank)`` entries for a word, ``()`` for a prefix of one,
+    and ``default`` otherwise.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, byteorder, metadata_length, key_count, slot_count, entry_count = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a dictionary index file")
+        if byteorder.rstrip(b"\0").decode("ascii") != sys.byteorder:
+            raise ValueError(f"{path} was built on a {byteorder.decode('ascii').rstrip(chr(0))}-endian machine")
+        offset = _HEADER.size
+        metadata = json.loads(bytes(view[offset : offset + metadata_length]).decode("utf-8"))
+        self.dictionaries: List[Tuple[str, int]] = [(name, size) for name, size in metadata["dictionaries"]]
+        self._names = [name for name, _ in self.dictionaries]
+        offset += metadata_length
+        offset += -offset % 4
+
+        def section(count: int) -> memoryview:
+            nonlocal offset
+            part = view[offset : offset + 4 * count].cast("I")
+            offset += 4 * count
+            return part
+
+        self._slots = section(slot_count)
+        self._key_offsets = section(key_count + 1)
+        self._entry_offsets = section(key_count + 1)
+        self._entries = section(entry_count)
+        self._keys = view[offset:]
+        self._mask = slot_count - 1
+        self._length = key_count
+
+    def matches_lists(self, ranked_dictionaries: Mapping[str, Mapping[str, int]]) -> bool:
+        """Return whether the file was built from lists with these names and sizes."""
+        return self.dictionaries == [(name, len(words)) for name, words in ranked_dictionaries.items()]
+
+    def get(self, key: str, default: Optional[Entries] = None) -> Optional[Entries]:
+        encoded = _encode(key)
+        slots, key_offsets, keys = self._slots, self._key_offsets, self._keys
+        slot = _key_hash(encoded) & self._mask
+        while True:
+            number = slots[slot]
+            if not number:
+                return default
+            number -= 1
+            if keys[key_offsets[number] : key_offsets[number + 1]] == encoded:
+                break
+            slot = (slot + 1) & self._mask
+        start, stop = self._entry_offsets[number], self._entry_offsets[number + 1]
+        if start == stop:
+            return ()
+        names = self._names
+        return tuple((names[packed & 0xFF], packed >> 8) for packed in self._entries[start:stop])
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def build_index_file(path: str) -> Dict[str, int]:
+    """Compile the matching script's ranked dictionaries into ``path``.
+
+    Returns the dictionary sizes that were written.
+    """
+    from .aadi_adapters import MODULES
+
+    matching = MODULES["matching"]
+    ranked = matching.RANKED_DICTIONARIES
+    write_index_file(path, matching.build_dictionary_index(ranked), ranked)
+    return {name: len(words) for name, words in ranked.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile the ranked dictionaries into a memory-mappable index")
+    parser.add_argument("path", help="Output file, e.g. data/dictionary.idx")
+    args = parser.parse_args(argv)
+    sizes = build_index_file(args.path)
+    print(f"Wrote {sum(sizes.values())} words from {len(sizes)} dictionaries to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
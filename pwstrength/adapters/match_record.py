@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, Tuple
+
+# Every field a matcher or the scorer can set, in display order.
+MATCH_FIELDS: Tuple[str, ...] = (
+    "pattern",
+    "i",
+    "j",
+    "token",
+    # dictionary
+    "matched_word",
+    "rank",
+    "dictionary_name",
+    "reversed",
+    "l33t",
+    "sub",
+    "sub_display",
+    # spatial
+    "graph",
+    "turns",
+    "shifted_count",
+    # repeat
+    "base_token",
+    "base_guesses",
+    "base_matches",
+    "repeat_count",
+    # sequence
+    "sequence_name",
+    "sequence_space",
+    "ascending",
+    # regex
+    "regex_name",
+    # date
+    "separator",
+    "year",
+    "month",
+    "day",
+    # scorer annotations
+    "guesses",
+    "guesses_log10",
+    "uppercase_variations",
+    "l33t_variations",
+)
+_FIELD_SET = frozenset(MATCH_FIELDS)
+
+
+class MatchRecord:
+    """Immutable, picklable pattern match shared by the matchers and scorer.
+
+    Records read like the zxcvbn match dicts they replace (``match["token"]``,
+    ``match.get("l33t")``, ``"sub" in match``) so the feedback code works
+    unchanged, but they cannot be mutated: the scorer returns annotated copies
+    through :meth:`replace`. Use :meth:`to_dict` at API boundaries.
+    """
+
+    __slots__ = MATCH_FIELDS
+
+    def __init__(self, **fields: Any) -> None:
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("MatchRecord is immutable; use replace()")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("MatchRecord is immutable; use replace()")
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return default
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for name in MATCH_FIELDS:
+            try:
+                yield name, getattr(self, name)
+            except AttributeError:
+                continue
+
+    def replace(self, **changes: Any) -> "MatchRecord":
+        """Return a copy with ``changes`` applied."""
+        fields = dict(self.items())
+        fields.update(changes)
+        return MatchRecord(**fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the zxcvbn-style dict, converting nested base matches too."""
+        result = dict(self.items())
+        if "base_matches" in result:
+            result["base_matches"] = [match.to_dict() for match in result["base_matches"]]
+        return result
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MatchRecord):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.items())
+        return f"MatchRecord({fields})"
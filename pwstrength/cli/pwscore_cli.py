@@ -2,9 +2,13 @@ from __future__ import annotations
 
 import argparse
 import json
-from typing import Iterable, Tuple
+from typing import TYPE_CHECKING, Iterable, Tuple
 
-from ..core import ScoreResult, score as score_password
+if TYPE_CHECKING:  # pragma: no cover
+    from ..core import ScoreResult
+
+# The scoring stack is imported when a candidate is scored, so argument errors
+# and --help return without loading it.
 
 
 def _format_rows(row: dict) -> Iterable[Tuple[str, str]]:
@@ -32,7 +36,7 @@ def _format_rows(row: dict) -> Iterable[Tuple[str, str]]:
 
 
 def _print_table(result: ScoreResult) -> None:
-    row = result.features.iloc[0].to_dict()
+    row = result.to_dict()
     print("Don't paste real passwords.")
     print("-" * 40)
     for name, value in _format_rows(row):
@@ -46,6 +50,8 @@ def _print_table(result: ScoreResult) -> None:
 
 def score(candidate: str, online: bool = False, tau: int = 10) -> dict:
     """Module-level helper returning the computed metrics."""
+    from ..core import score as score_password
+
     return score_password(candidate, online=online, tau=tau).to_dict()
 
 
@@ -55,9 +61,40 @@ def main(argv: list[str] | None = None) -> int:
     parser.add_argument("--online", action="store_true", help="Enable HIBP online queries")
     parser.add_argument("--tau", type=int, default=10, help="Label threshold for breached counts")
     parser.add_argument("--json", action="store_true", help="Emit JSON instead of human output")
+    parser.add_argument("--hibp-cache", metavar="PATH", help="SQLite file caching HIBP ranges between runs")
+    parser.add_argument("--hibp-dump", metavar="PATH", help="Converted Pwned Passwords dump for offline counts")
+    parser.add_argument("--hibp-bloom", metavar="PATH", help="Bloom filter that skips lookups for unbreached candidates")
     args = parser.parse_args(argv)
+    if args.hibp_cache and not args.online:
+        parser.error("--hibp-cache caches online lookups; add --online")
+    if args.hibp_bloom and not (args.online or args.hibp_dump):
+        parser.error("--hibp-bloom filters prevalence lookups; add --online or --hibp-dump")
+
+    from ..core import score as score_password
+
+    hibp_store = None
+    if args.hibp_cache:
+        from ..features.hibp_store import SQLiteRangeStore
+
+        hibp_store = SQLiteRangeStore(args.hibp_cache)
+    hibp_dump = None
+    if args.hibp_dump:
+        from ..features.hibp_dump import PwnedDump
+
+        hibp_dump = PwnedDump(args.hibp_dump)
+    hibp_bloom = None
+    if args.hibp_bloom:
+        from ..features.hibp_bloom import BloomFilter
 
-    result = score_password(args.candidate, online=args.online, tau=args.tau)
+        hibp_bloom = BloomFilter.load(args.hibp_bloom)
+    result = score_password(
+        args.candidate,
+        online=args.online,
+        tau=args.tau,
+        hibp_store=hibp_store,
+        hibp_dump=hibp_dump,
+        hibp_bloom=hibp_bloom,
+    )
     row = result.to_dict()
 
     if args.json:
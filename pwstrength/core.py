@@ -1,29 +1,52 @@
 from __future__ import annotations
 
+import dataclasses
 import json
-import math
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional
-
-import pandas as pd
-
-from .adapters import aadi_adapters
-from .features.entropy import length_and_classes, shannon_entropy_total
-from .features.hibp_client import HIBPPrevalence, get_prevalence
-from .features.zxcvbn_adapter import zxcvbn_features
-from .models.hybrid import hybrid_score_v0
+from functools import cached_property
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional
+
+from .pipeline import (
+    ChunkError,
+    DedupStats,
+    FeatureOptions,
+    WorkerPool,
+    dedupe_candidates,
+    expand,
+    resolve_columns,
+    run_stages,
+    run_stages_parallel,
+)
+from .schema import NESTED_COLUMNS, FeatureRecord, apply_schema
+
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+
+# pandas is imported inside the frame-building functions so that score_record
+# and the CLI start without it.
 
 
 @dataclass
 class ScoreResult:
-    """Typed response for the pwscore helper."""
+    """Typed response for the pwscore helper.
+
+    ``record`` is the plain feature row; the one-row ``features`` frame is only
+    built when first accessed.
+    """
 
     candidate: str
-    features: pd.DataFrame
+    record: FeatureRecord
     crack_times_display: Dict[str, str]
 
+    @cached_property
+    def features(self) -> pd.DataFrame:
+        import pandas as pd
+
+        return pd.DataFrame([self.record], columns=list(NESTED_COLUMNS))
+
     def to_dict(self) -> Dict[str, object]:
-        row = self.features.iloc[0].to_dict()
+        row = dict(self.record)
         row["crack_times_display"] = self.crack_times_display
         row["pw"] = self.candidate
         return row
@@ -32,72 +55,182 @@ class ScoreResult:
         return json.dumps(self.to_dict(), default=str, indent=2)
 
 
-def _safe_log_count(prevalence: HIBPPrevalence | None) -> float:
-    if not prevalence:
-        return 0.0
-    return prevalence.log_count
-
-
 def build_features(
     strings: Iterable[str],
     online: bool = False,
     tau: int = 10,
     session=None,
+    share_matches: bool = False,
+    columns: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 2048,
+    pool: Optional[WorkerPool] = None,
+    nested: bool = False,
+    dedupe: bool = True,
+    hibp_store=None,
+    hibp_dump=None,
+    hibp_bloom=None,
+    hibp_cache=None,
 ) -> pd.DataFrame:
-    """Assemble a tidy feature frame for downstream modeling."""
-    rows: List[Dict[str, object]] = []
-    for candidate in strings:
-        password = candidate or ""
-        matches = aadi_adapters.match_patterns(password)
-        guess_info = aadi_adapters.estimate_guesses(password, matches)
-        crack_info = aadi_adapters.crack_times(guess_info["guesses"])
-        feedback = aadi_adapters.human_feedback(password, matches, score=guess_info["score"])
-
-        entropy_bits = shannon_entropy_total(password)
-        length, class_count, class_flags = length_and_classes(password)
-        z_features = zxcvbn_features(password)
-
-        prevalence_mode = "online" if online else "offline"
-        hibp_count = 0
-        prevalence: Optional[HIBPPrevalence] = None
-        if online:
-            try:
-                prevalence = get_prevalence(password, session=session)
-                hibp_count = prevalence.count
-            except Exception:
-                prevalence_mode = "error"
-        log_count = _safe_log_count(prevalence)
-
-        row: Dict[str, object] = {
-            "pw": password,
-            "length": length,
-            "classes": class_count,
-            "class_flags": class_flags,
-            "H_bits": entropy_bits,
-            "zxcvbn_score": z_features["zxcvbn_score"],
-            "zxcvbn_guesses": z_features["zxcvbn_guesses"],
-            "zxcvbn_feedback": z_features["zxcvbn_feedback"],
-            "hibp_count": hibp_count,
-            "log_count": log_count,
-            "prevalence_mode": prevalence_mode,
-            "aadi_guesses": guess_info["guesses"],
-            "aadi_score": guess_info["score"],
-            "aadi_feedback": feedback,
-            "aadi_sequence": guess_info["sequence"],
-            "HybridScore_v0": 0.0,
-            "label_breached": 0,
-            "tau": tau,
-            "crack_times_display": crack_info["crack_times_display"],
-        }
-        row["HybridScore_v0"] = hybrid_score_v0(row)
-        row["label_breached"] = int((hibp_count or 0) >= tau)
-        rows.append(row)
-
-    return pd.DataFrame(rows)
-
-
-def score(candidate: str, online: bool = False, tau: int = 10, session=None) -> ScoreResult:
+    """Assemble a tidy feature frame for downstream modeling.
+
+    The frame follows the flat, typed ``pwstrength.schema.FEATURE_SCHEMA``;
+    ``nested=True`` returns the compatibility layout with dict and list cells
+    (``class_flags``, ``aadi_sequence``, ``crack_times_display``).
+
+    With ``share_matches=True`` the zxcvbn columns are derived from the Aadi
+    match pass instead of running the ``zxcvbn`` package on each candidate.
+    ``columns`` selects a subset of ``FEATURE_COLUMNS`` (``pw`` is always
+    kept); only the stages those columns depend on are run.
+
+    ``workers > 1`` scores ``chunksize`` candidates at a time in a process
+    pool; the frame is identical to the serial one and failed chunks raise
+    ``ChunkError``. ``pool`` reuses an open ``pipeline.WorkerPool`` created
+    for the same options instead of starting one for this call.
+
+    Repeated candidates are scored once (HIBP included) and fanned back out to
+    input order; ``frame.attrs["dedup"]`` holds the call's candidate,
+    distinct and hit-ratio counts (``DedupStats.to_dict``).
+    ``dedupe=False`` scores every row.
+
+    ``hibp_store`` is an optional persistent range cache for online builds,
+    e.g. ``pwstrength.features.hibp_store.SQLiteRangeStore``. ``hibp_dump``
+    (a ``pwstrength.features.hibp_dump.PwnedDump``) answers prevalence from a
+    local copy of the Pwned Passwords dump instead, without the network.
+    ``hibp_bloom`` (a ``pwstrength.features.hibp_bloom.BloomFilter``) skips
+    the lookup for candidates it rules out, and ``hibp_cache`` (a
+    ``hibp_client.RangeCache``) replaces the shared in-memory range cache;
+    with ``workers > 1`` each worker fills its own empty copy of it instead.
+    """
+    import pandas as pd
+
+    selected = resolve_columns(columns, nested=nested)
+    options = FeatureOptions(
+        online=online,
+        tau=tau,
+        session=session,
+        share_matches=share_matches,
+        nested=nested,
+        hibp_store=hibp_store,
+        hibp_dump=hibp_dump,
+        hibp_bloom=hibp_bloom,
+        hibp_cache=hibp_cache,
+    )
+    passwords = [candidate or "" for candidate in strings]
+    if dedupe:
+        distinct, inverse, stats = dedupe_candidates(passwords)
+    else:
+        distinct, inverse, stats = passwords, None, DedupStats(candidates=len(passwords), distinct=len(passwords))
+    if pool is not None or (workers is not None and workers > 1):
+        try:
+            values = run_stages_parallel(
+                distinct, selected, options, workers=workers or 1, chunksize=chunksize, pool=pool
+            )
+        except ChunkError as error:
+            if inverse is None:
+                raise
+            raise error.remap(inverse) from None
+    else:
+        values = run_stages(distinct, selected, options)
+    if inverse is not None and stats.hits:
+        values = expand(values, inverse)
+    frame = pd.DataFrame(values, columns=list(selected))
+    if not nested:
+        frame = apply_schema(frame)
+    frame.attrs["dedup"] = stats.to_dict()
+    return frame
+
+
+def iter_features(
+    strings: Iterable[str],
+    batch_size: int = 10_000,
+    **options,
+) -> Iterator[pd.DataFrame]:
+    """Yield ``build_features`` frames for consecutive ``batch_size`` slices.
+
+    The input is consumed lazily, so memory is bounded by the batch rather
+    than the corpus. ``options`` are passed to ``build_features``; frame
+    indexes continue across batches, so concatenating them gives the same
+    frame as one ``build_features`` call. With ``workers > 1`` one worker
+    pool serves every batch.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    workers = options.get("workers")
+    if workers is None or workers <= 1 or options.get("pool") is not None:
+        yield from _iter_batches(strings, batch_size, options)
+        return
+    fields = {field.name for field in dataclasses.fields(FeatureOptions)}
+    feature_options = FeatureOptions(**{name: value for name, value in options.items() if name in fields})
+    with WorkerPool(feature_options, workers) as pool:
+        yield from _iter_batches(strings, batch_size, {**options, "pool": pool})
+
+
+def _iter_batches(strings: Iterable[str], batch_size: int, options: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+    import pandas as pd
+
+    iterator = iter(strings)
+    offset = 0
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        frame = build_features(batch, **options)
+        frame.index = pd.RangeIndex(offset, offset + len(frame))
+        offset += len(frame)
+        yield frame
+
+
+def score_record(
+    candidate: str,
+    online: bool = False,
+    tau: int = 10,
+    session=None,
+    share_matches: bool = False,
+    hibp_store=None,
+    hibp_dump=None,
+    hibp_bloom=None,
+    hibp_cache=None,
+) -> FeatureRecord:
+    """Score one candidate and return its row as a plain dict, without pandas."""
+    options = FeatureOptions(
+        online=online,
+        tau=tau,
+        session=session,
+        share_matches=share_matches,
+        nested=True,
+        hibp_store=hibp_store,
+        hibp_dump=hibp_dump,
+        hibp_bloom=hibp_bloom,
+        hibp_cache=hibp_cache,
+    )
+    values = run_stages([candidate or ""], NESTED_COLUMNS, options)
+    return FeatureRecord(**{column: column_values[0] for column, column_values in values.items()})
+
+
+def score(
+    candidate: str,
+    online: bool = False,
+    tau: int = 10,
+    session=None,
+    share_matches: bool = False,
+    hibp_store=None,
+    hibp_dump=None,
+    hibp_bloom=None,
+    hibp_cache=None,
+) -> ScoreResult:
     """Convenience wrapper used by the CLI and external callers."""
-    features = build_features([candidate], online=online, tau=tau, session=session)
-    crack_times = features.iloc[0]["crack_times_display"] or {}
-    return ScoreResult(candidate=candidate, features=features, crack_times_display=crack_times)
+    record = score_record(
+        candidate,
+        online=online,
+        tau=tau,
+        session=session,
+        share_matches=share_matches,
+        hibp_store=hibp_store,
+        hibp_dump=hibp_dump,
+        hibp_bloom=hibp_bloom,
+        hibp_cache=hibp_cache,
+    )
+    return ScoreResult(
+        candidate=candidate, record=record, crack_times_display=record["crack_times_display"] or {}
+    )
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import pathlib
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+from .core import iter_features
+
+FORMATS = {".parquet": "parquet", ".pq": "parquet", ".csv": "csv"}
+
+
+def _infer_format(path: pathlib.Path, fmt: Optional[str]) -> str:
+    if fmt is not None:
+        if fmt not in set(FORMATS.values()):
+            raise ValueError(f"Unknown format {fmt!r}; expected 'parquet' or 'csv'")
+        return fmt
+    try:
+        return FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Cannot infer a format from {path.name!r}; pass fmt='parquet' or fmt='csv'") from None
+
+
+def _encode_nested(frame: pd.DataFrame) -> pd.DataFrame:
+    # dict/list cells become JSON text so every batch shares one file schema.
+    nested = [
+        column
+        for column in frame.columns
+        if frame[column].dtype == object and any(isinstance(value, (dict, list)) for value in frame[column])
+    ]
+    if not nested:
+        return frame
+    frame = frame.copy()
+    for column in nested:
+        frame[column] = [json.dumps(value, default=str) for value in frame[column]]
+    return frame
+
+
+class FeatureWriter:
+    """Append feature frames to a single Parquet or CSV file as they arrive.
+
+    Parquet batches become row groups of one file whose schema is fixed by the
+    first batch; CSV batches are appended below a single header. Columns
+    holding dicts or lists (``class_flags``, ``aadi_sequence``, ...) are stored
+    as JSON text. Parent directories are created, and an existing file is
+    replaced.
+    """
+
+    def __init__(self, path: Union[str, pathlib.Path], fmt: Optional[str] = None) -> None:
+        self.path = pathlib.Path(path)
+        self.format = _infer_format(self.path, fmt)
+        self.rows = 0
+        self._parquet_writer = None
+        self._schema = None
+        self._started = False
+
+    def write(self, frame: pd.DataFrame) -> None:
+        frame = _encode_nested(frame)
+        if not self._started:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.format == "parquet":
+            self._write_parquet(frame)
+        else:
+            frame.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+        self.rows += len(frame)
+
+    def _write_parquet(self, frame: pd.DataFrame) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover
+            raise RuntimeError("The 'pyarrow' package is required to write Parquet features.") from exc
+
+        if self._parquet_writer is None:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            self._schema = table.schema
+            self._parquet_writer = pq.ParquetWriter(self.path, self._schema)
+        else:
+            table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+        self._parquet_writer.write_table(table)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self) -> "FeatureWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_features(
+    strings: Iterable[str],
+    path: Union[str, pathlib.Path],
+    batch_size: int = 10_000,
+    fmt: Optional[str] = None,
+    **options,
+) -> int:
+    """Stream features for ``strings`` into ``path`` and return the row count.
+
+    The format follows the suffix (``.parquet``/``.pq`` or ``.csv``) unless
+    ``fmt`` is given; ``options`` are passed to ``build_features``.
+    """
+    with FeatureWriter(path, fmt=fmt) as writer:
+        for frame in iter_features(strings, batch_size=batch_size, **options):
+            writer.write(frame)
+    return writer.rows
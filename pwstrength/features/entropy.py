@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import math
-from typing import Dict, Tuple
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
 
 
 CHAR_CLASSES = {
@@ -47,3 +49,98 @@ def length_and_classes(password: str) -> Tuple[int, int, Dict[str, bool]]:
 
     class_count = sum(1 for value in flags.values() if value)
     return length, class_count, flags
+
+
+CLASS_ORDER = ("lower", "upper", "digit", "space", "symbol")
+_SYMBOL = len(CLASS_ORDER) - 1
+_CLASS_CACHE: Dict[int, int] = {}
+
+
+def _char_class(char: str) -> int:
+    for index, checker in enumerate(CHAR_CLASSES.values()):
+        if checker(char):
+            return index
+    return _SYMBOL
+
+
+_LATIN1_CLASSES = np.array([_char_class(chr(code)) for code in range(256)], dtype=np.uint8)
+
+
+def _code_point_groups(passwords: Sequence[str]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield (row indexes, code points as an (n, length) uint32 array) per length."""
+    by_length: Dict[int, List[int]] = {}
+    for index, password in enumerate(passwords):
+        by_length.setdefault(len(password), []).append(index)
+    for length, indexes in by_length.items():
+        joined = "".join(passwords[index] for index in indexes)
+        codes = np.frombuffer(joined.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        yield np.array(indexes, dtype=np.intp), codes.reshape(len(indexes), length)
+
+
+def _classify(codes: np.ndarray) -> np.ndarray:
+    classes = np.full(codes.shape, _SYMBOL, dtype=np.uint8)
+    latin = codes < 256
+    classes[latin] = _LATIN1_CLASSES[codes[latin]]
+    if not latin.all():
+        wide = codes[~latin]
+        for code in np.unique(wide).tolist():
+            if code not in _CLASS_CACHE:
+                _CLASS_CACHE[code] = _char_class(chr(code))
+        classes[~latin] = np.array([_CLASS_CACHE[code] for code in wide.tolist()], dtype=np.uint8)
+    return classes
+
+
+def _entropy_terms(length: int) -> np.ndarray:
+    # terms[count] is the scalar loop's probability * log2(probability).
+    terms = np.zeros(length + 1)
+    for count in range(1, length + 1):
+        probability = count / length
+        terms[count] = probability * math.log2(probability)
+    return terms
+
+
+def shannon_entropy_batch(passwords: Sequence[str]) -> np.ndarray:
+    """Return ``shannon_entropy_total`` for each candidate as a float64 array.
+
+    Candidates are grouped by length and handled as code-point arrays. Each
+    row subtracts its terms in first-occurrence order, as the scalar loop
+    does, so the results are bit-identical.
+    """
+    passwords = [password or "" for password in passwords]
+    result = np.zeros(len(passwords))
+    for indexes, codes in _code_point_groups(passwords):
+        rows, length = codes.shape
+        if length == 0:
+            continue
+        order = np.argsort(codes, axis=1, kind="stable")
+        ordered = np.take_along_axis(codes, order, axis=1)
+        starts_mask = np.ones(codes.shape, dtype=bool)
+        starts_mask[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        starts = np.flatnonzero(starts_mask)
+        counts = np.diff(np.append(starts, rows * length))
+        # place each distinct character's term at its first occurrence
+        terms = np.zeros(codes.shape)
+        terms[starts // length, order.ravel()[starts]] = _entropy_terms(length)[counts]
+        entropy = np.zeros(rows)
+        for column in range(length):
+            entropy -= terms[:, column]
+        result[indexes] = entropy * length
+    return result
+
+
+def length_and_classes_batch(passwords: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """Return lengths, class counts and per-class flag arrays for each candidate.
+
+    The batch form of ``length_and_classes``; flags are keyed like its dict.
+    """
+    passwords = [password or "" for password in passwords]
+    lengths = np.array([len(password) for password in passwords], dtype=np.int64)
+    flags = {name: np.zeros(len(passwords), dtype=bool) for name in CLASS_ORDER}
+    for indexes, codes in _code_point_groups(passwords):
+        if codes.shape[1] == 0:
+            continue
+        classes = _classify(codes)
+        for value, name in enumerate(CLASS_ORDER):
+            flags[name][indexes] = (classes == value).any(axis=1)
+    class_counts = np.sum([flags[name] for name in CLASS_ORDER], axis=0, dtype=np.int64)
+    return lengths, class_counts, flags
@@ -0,0 +1,198 @@
+"""Compact in-memory pre-filter for Pwned Passwords lookups.
+
+Most candidates in a sweep are not in the breach corpus, yet each one costs
+a range request or a dump lookup. A ``BloomFilter`` built from the same hash
+set answers "definitely absent" from a bit array. ``hibp_client`` checks it
+first and returns a count of 0 without a lookup. A positive answer may be a
+false positive, so the real count is still fetched.
+
+Build it once from a converted dump (see ``hibp_dump``)::
+
+    python -m pwstrength.features.hibp_bloom data/pwned.bin data/pwned.bloom --fp-rate 0.01 --max-mb 1024
+
+and pass ``BloomFilter.load("data/pwned.bloom")`` as ``hibp_bloom``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .hibp_dump import PwnedDump
+
+MAGIC = b"PWBLOOM1"
+# magic, bit count, hash count, item count
+_HEADER = struct.Struct("<8sQQQ")
+_MASK64 = (1 << 64) - 1
+# The two 64-bit hashes of a SHA-1 digest are its bytes 4-11 and 12-19, which
+# lie inside the 18-byte hash tails of a converted dump.
+_DUMP_HASHES = np.dtype({"names": ["h1", "h2"], "formats": ["<u8", "<u8"], "offsets": [2, 10], "itemsize": 22})
+_BUILD_CHUNK = 1 << 20
+
+
+def optimal_size(items: int, fp_rate: float, max_bytes: Optional[int] = None) -> int:
+    """Return the bit count for ``items`` at ``fp_rate``, capped at ``max_bytes``."""
+    if not 0 < fp_rate < 1:
+        raise ValueError("fp_rate must be between 0 and 1")
+    bits = math.ceil(-max(items, 1) * math.log(fp_rate) / math.log(2) ** 2)
+    if max_bytes is not None:
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        bits = min(bits, max_bytes * 8)
+    return max(8, -(-bits // 8) * 8)
+
+
+def _digest_hashes(digest: bytes) -> tuple:
+    return int.from_bytes(digest[4:12], "little"), int.from_bytes(digest[12:20], "little") | 1
+
+
+class BloomFilter:
+    """Bloom filter over SHA-1 digests with double hashing.
+
+    Size it with ``for_capacity``; a ``max_bytes`` budget smaller than the
+    target needs trades a higher ``expected_fp_rate`` for less memory.
+    Filters loaded with ``load`` are memory-mapped read-only and pickle by
+    path, so worker processes map the same file; other filters pickle their
+    bit array.
+    """
+
+    def __init__(self, bit_count: int, hash_count: int, bits: Optional[Union[bytearray, memoryview]] = None) -> None:
+        if bit_count < 8 or bit_count % 8:
+            raise ValueError("bit_count must be a positive multiple of 8")
+        if hash_count < 1:
+            raise ValueError("hash_count must be at least 1")
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.item_count = 0
+        self.path: Optional[str] = None
+        self._bits = bytearray(bit_count // 8) if bits is None else bits
+
+    @classmethod
+    def for_capacity(cls, items: int, fp_rate: float = 0.01, max_bytes: Optional[int] = None) -> BloomFilter:
+        bit_count = optimal_size(items, fp_rate, max_bytes)
+        hash_count = max(1, round(bit_count / max(items, 1) * math.log(2)))
+        return cls(bit_count, hash_count)
+
+    @classmethod
+    def from_dump(cls, dump: PwnedDump, fp_rate: float = 0.01, max_bytes: Optional[int] = None) -> BloomFilter:
+        """Build a filter holding every hash of a converted dump."""
+        bloom = cls.for_capacity(len(dump), fp_rate, max_bytes)
+        records = np.frombuffer(dump.records(), dtype=_DUMP_HASHES)
+        for start in range(0, len(records), _BUILD_CHUNK):
+            chunk = records[start : start + _BUILD_CHUNK]
+            bloom._add_hashes(chunk["h1"], chunk["h2"] | np.uint64(1))
+        return bloom
+
+    def _add_hashes(self, h1: np.ndarray, h2: np.ndarray) -> None:
+        bits = np.frombuffer(self._bits, dtype=np.uint8)
+        size = np.uint64(self.bit_count)
+        position = h1.copy()
+        with np.errstate(over="ignore"):
+            for _ in range(self.hash_count):
+                index = position % size
+                np.bitwise_or.at(bits, index >> np.uint64(3), np.left_shift(1, index & np.uint64(7)).astype(np.uint8))
+                position += h2
+        self.item_count += len(h1)
+
+    def _positions(self, digest: bytes) -> Iterable[int]:
+        h1, h2 = _digest_hashes(digest)
+        for _ in range(self.hash_count):
+            yield h1 % self.bit_count
+            h1 = (h1 + h2) & _MASK64
+
+    def add_digest(self, digest: bytes) -> None:
+        bits = self._bits
+        for index in self._positions(digest):
+            bits[index >> 3] |= 1 << (index & 7)
+        self.item_count += 1
+
+    def add(self, candidate: str) -> None:
+        self.add_digest(hashlib.sha1(candidate.encode("utf-8")).digest())
+
+    def might_contain_digest(self, digest: bytes) -> bool:
+        bits = self._bits
+        return all(bits[index >> 3] >> (index & 7) & 1 for index in self._positions(digest))
+
+    def might_contain(self, candidate: str) -> bool:
+        """Return False only if the candidate is certainly not in the hash set."""
+        return self.might_contain_digest(hashlib.sha1(candidate.encode("utf-8")).digest())
+
+    def __contains__(self, candidate: object) -> bool:
+        return isinstance(candidate, str) and self.might_contain(candidate)
+
+    @property
+    def expected_fp_rate(self) -> float:
+        """False-positive rate for the items added so far."""
+        return (1 - math.exp(-self.hash_count * self.item_count / self.bit_count)) ** self.hash_count
+
+    @property
+    def nbytes(self) -> int:
+        return self.bit_count // 8
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as handle:
+            handle.write(_HEADER.pack(MAGIC, self.bit_count, self.hash_count, self.item_count))
+            handle.write(self._bits)
+
+    @classmethod
+    def load(cls, path: str) -> BloomFilter:
+        with open(path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, bit_count, hash_count, item_count = _HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            raise ValueError(f"{os.fspath(path)} is not a Bloom filter file")
+        if len(mapped) != _HEADER.size + bit_count // 8:
+            raise ValueError(f"{os.fspath(path)} is truncated")
+        bloom = cls(bit_count, hash_count, memoryview(mapped)[_HEADER.size :])
+        bloom.item_count = item_count
+        bloom.path = os.fspath(path)
+        return bloom
+
+    def __getstate__(self) -> Dict[str, object]:
+        if self.path is not None:
+            return {"path": self.path}
+        return {
+            "bit_count": self.bit_count,
+            "hash_count": self.hash_count,
+            "item_count": self.item_count,
+            "bits": bytes(self._bits),
+        }
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        if "path" in state:
+            self.__dict__.update(BloomFilter.load(state["path"]).__dict__)
+            return
+        self.__init__(state["bit_count"], state["hash_count"], bytearray(state["bits"]))
+        self.item_count = state["item_count"]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build a Bloom filter from a converted Pwned Passwords dump")
+    parser.add_argument("dump", help="File written by pwstrength.features.hibp_dump")
+    parser.add_argument("path", help="Output file, e.g. data/pwned.bloom")
+    parser.add_argument("--fp-rate", type=float, default=0.01, help="Target false-positive rate")
+    parser.add_argument("--max-mb", type=float, help="Memory budget for the bit array, in MiB")
+    args = parser.parse_args(argv)
+
+    from .hibp_dump import PwnedDump
+
+    max_bytes = int(args.max_mb * 2**20) if args.max_mb else None
+    bloom = BloomFilter.from_dump(PwnedDump(args.dump), fp_rate=args.fp_rate, max_bytes=max_bytes)
+    bloom.save(args.path)
+    print(
+        f"Wrote {bloom.nbytes / 2**20:.1f} MiB filter for {bloom.item_count} hashes "
+        f"(k={bloom.hash_count}, expected FP rate {bloom.expected_fp_rate:.4f}) to {args.path}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,17 +2,25 @@ from __future__ import annotations
 
 import hashlib
 import math
+import sys
+import threading
 import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
-import requests
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+    from .hibp_bloom import BloomFilter
+    from .hibp_store import SQLiteRangeStore
 
 
 HIBP_RANGE_URL = "https://api.pwnedpasswords.com/range/"
 MAX_CACHE_SIZE = 256
-_PREFIX_CACHE: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+# Concurrent range requests made by get_prevalence_batch.
+MAX_CONCURRENT_REQUESTS = 8
 
 
 @dataclass(frozen=True)
@@ -26,20 +34,115 @@ def _hash_candidate(candidate: str) -> Tuple[str, str]:
     return digest[:5], digest[5:]
 
 
-def _update_cache(prefix: str, mapping: Dict[str, int]) -> None:
-    if prefix in _PREFIX_CACHE:
-        _PREFIX_CACHE.move_to_end(prefix)
-    _PREFIX_CACHE[prefix] = mapping
-    while len(_PREFIX_CACHE) > MAX_CACHE_SIZE:
-        _PREFIX_CACHE.popitem(last=False)
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    entry_bytes: int
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _range_bytes(mapping: Dict[str, int]) -> int:
+    # Suffix strings dominate; the counts are mostly shared small ints.
+    return sys.getsizeof(mapping) + sum(sys.getsizeof(suffix) for suffix in mapping)
+
+
+class RangeCache:
+    """Thread-safe LRU cache of HIBP range responses, keyed by SHA-1 prefix.
+
+    The least recently used ranges are evicted once there are more than
+    ``max_entries`` of them or, if ``max_bytes`` is set, once their estimated
+    size exceeds it. ``stats()`` reports hits, misses, evictions and the
+    current entry count and size. A cache pickles as an empty cache with the
+    same limits: in a parallel ``build_features`` each worker process gets one
+    such copy for the whole build, and the caller's cache (and its ``stats()``)
+    is not used.
+    """
+
+    def __init__(self, max_entries: Optional[int] = MAX_CACHE_SIZE, max_bytes: Optional[int] = None) -> None:
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Dict[str, int], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._entry_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, prefix: str) -> Optional[Dict[str, int]]:
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(prefix)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, prefix: str, mapping: Dict[str, int]) -> None:
+        size = _range_bytes(mapping)
+        with self._lock:
+            previous = self._entries.pop(prefix, None)
+            if previous is not None:
+                self._entry_bytes -= previous[1]
+            self._entries[prefix] = (mapping, size)
+            self._entry_bytes += size
+            while len(self._entries) > 1 and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._entry_bytes > self.max_bytes)
+            ):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._entry_bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._entry_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._entries), self._entry_bytes)
+
+    def __contains__(self, prefix: object) -> bool:
+        with self._lock:
+            return prefix in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self) -> Dict[str, object]:
+        return {"max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.__init__(**state)
+
+
+# Used by every lookup that is not given its own cache.
+DEFAULT_CACHE = RangeCache()
 
 
 def clear_cache() -> None:
-    _PREFIX_CACHE.clear()
+    DEFAULT_CACHE.clear()
 
 
-def _fetch_range(prefix: str, session: Optional[requests.Session], timeout: float) -> Dict[str, int]:
-    session = session or requests.Session()
+def _request_range(prefix: str, session: Optional[requests.Session], timeout: float) -> Dict[str, int]:
+    if session is None:
+        import requests  # deferred: only online lookups need it
+
+        session = requests.Session()
     url = f"{HIBP_RANGE_URL}{prefix}"
     headers = {
         "Add-Padding": "true",
@@ -60,7 +163,6 @@ def _fetch_range(prefix: str, session: Optional[requests.Session], timeout: floa
                     result[suffix] = int(count.strip())
                 except ValueError:
                     continue
-            _update_cache(prefix, result)
             return result
         time.sleep(backoff)
         backoff *= 2
@@ -69,22 +171,124 @@ def _fetch_range(prefix: str, session: Optional[requests.Session], timeout: floa
     raise RuntimeError("HIBP query failed")  # failsafe
 
 
-def _range_lookup(prefix: str, session: Optional[requests.Session], timeout: float) -> Dict[str, int]:
-    if prefix in _PREFIX_CACHE:
-        _PREFIX_CACHE.move_to_end(prefix)
-        return _PREFIX_CACHE[prefix]
-    return _fetch_range(prefix, session, timeout)
+def _range_lookup(
+    prefix: str,
+    session: Optional[requests.Session],
+    timeout: float,
+    store: Optional[SQLiteRangeStore] = None,
+    cache: Optional[RangeCache] = None,
+) -> Dict[str, int]:
+    cache = DEFAULT_CACHE if cache is None else cache
+    cached = cache.get(prefix)
+    if cached is not None:
+        return cached
+    if store is not None:
+        stored = store.get(prefix)
+        if stored is not None:
+            cache.put(prefix, stored)
+            return stored
+    result = _request_range(prefix, session, timeout)
+    cache.put(prefix, result)
+    if store is not None:
+        store.put(prefix, result)
+    return result
+
 
+def get_count(
+    candidate: str,
+    session: Optional[requests.Session] = None,
+    timeout: float = 10.0,
+    store: Optional[SQLiteRangeStore] = None,
+    bloom: Optional[BloomFilter] = None,
+    cache: Optional[RangeCache] = None,
+) -> int:
+    """Return the breach count for the candidate using the k-anonymity API.
 
-def get_count(candidate: str, session: Optional[requests.Session] = None, timeout: float = 10.0) -> int:
-    """Return the breach count for the candidate using the k-anonymity API."""
-    if not candidate:
+    Ranges are kept in ``cache`` (``DEFAULT_CACHE`` unless given). ``store`` is
+    an optional persistent range cache (``hibp_store``) consulted after it and
+    filled from the network. Candidates that an optional ``bloom`` filter
+    (``hibp_bloom``) rules out count 0 without a lookup.
+    """
+    if not candidate or (bloom is not None and not bloom.might_contain(candidate)):
         return 0
     prefix, suffix = _hash_candidate(candidate)
-    response = _range_lookup(prefix, session, timeout)
+    response = _range_lookup(prefix, session, timeout, store, cache)
     return response.get(suffix.upper(), 0)
 
 
-def get_prevalence(candidate: str, session: Optional[requests.Session] = None, timeout: float = 10.0) -> HIBPPrevalence:
-    count = get_count(candidate, session=session, timeout=timeout)
+def get_prevalence(
+    candidate: str,
+    session: Optional[requests.Session] = None,
+    timeout: float = 10.0,
+    store: Optional[SQLiteRangeStore] = None,
+    bloom: Optional[BloomFilter] = None,
+    cache: Optional[RangeCache] = None,
+) -> HIBPPrevalence:
+    count = get_count(candidate, session=session, timeout=timeout, store=store, bloom=bloom, cache=cache)
     return HIBPPrevalence(count=count, log_count=math.log1p(count))
+
+
+def get_prevalence_batch(
+    candidates: Iterable[str],
+    session: Optional[requests.Session] = None,
+    timeout: float = 10.0,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+    store: Optional[SQLiteRangeStore] = None,
+    bloom: Optional[BloomFilter] = None,
+    cache: Optional[RangeCache] = None,
+) -> List[Optional[HIBPPrevalence]]:
+    """Return the prevalence of every candidate, fetching each range once.
+
+    Candidates are hashed up front and grouped by SHA-1 prefix; uncached
+    prefixes are requested concurrently by at most ``max_workers`` threads.
+    An entry is ``None`` when its range could not be fetched. Candidates that
+    ``bloom`` rules out count 0 and are not looked up.
+    """
+    candidates = list(candidates)
+    hashes = {
+        candidate: _hash_candidate(candidate)
+        for candidate in set(candidates)
+        if candidate and (bloom is None or bloom.might_contain(candidate))
+    }
+    cache = DEFAULT_CACHE if cache is None else cache
+    ranges: Dict[str, Optional[Dict[str, int]]] = {}
+    for prefix in {prefix for prefix, _ in hashes.values()}:
+        cached = cache.get(prefix)
+        if cached is not None:
+            ranges[prefix] = cached
+    missing = sorted({prefix for prefix, _ in hashes.values()}.difference(ranges))
+    if store is not None and missing:
+        for prefix in missing:
+            stored = store.get(prefix)
+            if stored is not None:
+                ranges[prefix] = stored
+                cache.put(prefix, stored)
+        missing = [prefix for prefix in missing if prefix not in ranges]
+
+    if missing:
+        # Threads only do network I/O; caches are updated from this thread.
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as pool:
+            futures = {prefix: pool.submit(_request_range, prefix, session, timeout) for prefix in missing}
+            for prefix, future in futures.items():
+                try:
+                    ranges[prefix] = future.result()
+                except Exception:
+                    ranges[prefix] = None
+                    continue
+                cache.put(prefix, ranges[prefix])
+                if store is not None:
+                    store.put(prefix, ranges[prefix])
+
+    results: List[Optional[HIBPPrevalence]] = []
+    for candidate in candidates:
+        if candidate not in hashes:
+            results.append(HIBPPrevalence(count=0, log_count=0.0))
+            continue
+        prefix, suffix = hashes[candidate]
+        response = ranges[prefix]
+        if response is None:
+            results.append(None)
+            continue
+        count = response.get(suffix.upper(), 0)
+        results.append(HIBPPrevalence(count=count, log_count=math.log1p(count)))
+    return results
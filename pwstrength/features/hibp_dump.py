@@ -0,0 +1,169 @@
+"""Offline Pwned Passwords lookups from a local copy of the SHA-1 dump.
+
+The downloadable dump ("ordered by hash") is a text file of
+``SHA1HEX:count`` lines, about 40 GB. ``convert_dump`` turns it once into a
+fixed-width binary file: a 65,536-entry index of record offsets keyed by the
+first two hash bytes, followed by 22-byte records (the remaining 18 hash
+bytes and a little-endian uint32 count). That is roughly half the size of
+the text. ``PwnedDump`` maps the file read-only and answers ``get_count`` by
+binary search within one index bucket, so lookups touch a few pages and
+never use the network.
+
+Convert the dump once::
+
+    python -m pwstrength.features.hibp_dump pwned-passwords-sha1-ordered-by-hash.txt data/pwned.bin
+
+and pass ``PwnedDump("data/pwned.bin")`` as ``hibp_dump`` to ``build_features``
+or ``score``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+from array import array
+from typing import Dict, List, Optional
+
+from .hibp_client import HIBPPrevalence
+
+MAGIC = b"PWDUMP01"
+# magic, record count
+_HEADER = struct.Struct("<8sQ")
+_BUCKETS = 1 << 16
+_INDEX = struct.Struct(f"<{_BUCKETS + 1}Q")
+# hash bytes after the bucket prefix, count
+_RECORD = struct.Struct("<18sI")
+_MAX_COUNT = 0xFFFFFFFF
+_WRITE_BUFFER = 1 << 20
+
+
+def convert_dump(source: str, path: str) -> int:
+    """Convert the ordered-by-hash SHA-1 text dump at ``source`` into ``path``.
+
+    Raises ``ValueError`` if a line is not ``SHA1HEX:count`` or the hashes are
+    not in ascending order. Returns the number of records written.
+    """
+    starts = array("Q", [0]) * (_BUCKETS + 1)
+    if starts.itemsize != 8:  # pragma: no cover
+        raise RuntimeError("array('Q') is not 64-bit on this platform")
+    partial = f"{os.fspath(path)}.partial"
+    records = 0
+    previous = b""
+    try:
+        with open(source, "rb") as lines, open(partial, "wb") as out:
+            out.write(b"\0" * (_HEADER.size + _INDEX.size))
+            buffer = bytearray()
+            for line_number, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                digest_hex, _, count = line.partition(b":")
+                try:
+                    if len(digest_hex) != 40:
+                        raise ValueError
+                    digest = bytes.fromhex(digest_hex.decode("ascii"))
+                    count = int(count)
+                except ValueError:
+                    raise ValueError(f"{source}:{line_number}: expected a 'SHA1HEX:count' line") from None
+                if digest <= previous:
+                    raise ValueError(f"{source}:{line_number}: hashes are not in ascending order")
+                previous = digest
+                starts[(digest[0] << 8 | digest[1]) + 1] += 1
+                buffer += _RECORD.pack(digest[2:], min(count, _MAX_COUNT))
+                records += 1
+                if len(buffer) >= _WRITE_BUFFER:
+                    out.write(buffer)
+                    buffer.clear()
+            out.write(buffer)
+            for bucket in range(1, _BUCKETS + 1):
+                starts[bucket] += starts[bucket - 1]
+            out.seek(0)
+            out.write(_HEADER.pack(MAGIC, records))
+            out.write(_INDEX.pack(*starts))
+    except BaseException:
+        os.remove(partial)
+        raise
+    os.replace(partial, path)
+    return records
+
+
+class PwnedDump:
+    """Read-only view of a ``convert_dump`` file.
+
+    Instances pickle by path, so worker processes map the same file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.fspath(path)
+        with open(self.path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, records = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a converted Pwned Passwords dump")
+        self._base = _HEADER.size + _INDEX.size
+        if len(self._map) != self._base + records * _RECORD.size:
+            raise ValueError(f"{self.path} is truncated")
+        self._starts = _INDEX.unpack_from(self._map, _HEADER.size)
+        self._length = records
+
+    def count_for_digest(self, digest: bytes) -> int:
+        """Return the count stored for a 20-byte SHA-1 digest, or 0."""
+        bucket = digest[0] << 8 | digest[1]
+        low, high = self._starts[bucket], self._starts[bucket + 1]
+        key = digest[2:]
+        data, base, width = self._map, self._base, _RECORD.size
+        while low < high:
+            middle = (low + high) // 2
+            offset = base + middle * width
+            if data[offset : offset + 18] < key:
+                low = middle + 1
+            else:
+                high = middle
+        offset = base + low * width
+        if low < self._starts[bucket + 1] and data[offset : offset + 18] == key:
+            return _RECORD.unpack_from(data, offset)[1]
+        return 0
+
+    def get_count(self, candidate: str) -> int:
+        """Return the breach count for the candidate, as ``hibp_client.get_count`` would."""
+        if not candidate:
+            return 0
+        return self.count_for_digest(hashlib.sha1(candidate.encode("utf-8")).digest())
+
+    def get_prevalence(self, candidate: str) -> HIBPPrevalence:
+        count = self.get_count(candidate)
+        return HIBPPrevalence(count=count, log_count=math.log1p(count))
+
+    def records(self) -> memoryview:
+        """Return the raw 22-byte records, e.g. for building a ``hibp_bloom`` filter."""
+        return memoryview(self._map)[self._base :]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __getstate__(self) -> Dict[str, object]:
+        return {"path": self.path}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.__init__(state["path"])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert the SHA-1 Pwned Passwords dump for offline lookups")
+    parser.add_argument("source", help="pwned-passwords-sha1-ordered-by-hash text file")
+    parser.add_argument("path", help="Output file, e.g. data/pwned.bin")
+    args = parser.parse_args(argv)
+    records = convert_dump(args.source, args.path)
+    print(f"Wrote {records} hashes to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Optional
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600.0
+BUSY_TIMEOUT_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ranges (
+    prefix TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ranges_fetched_at ON ranges (fetched_at);
+"""
+
+
+def _encode_range(mapping: Dict[str, int]) -> bytes:
+    # Padding rows carry a zero count, which get_count returns for absent
+    # suffixes anyway, so only real hashes are kept.
+    lines = "\n".join(f"{suffix}:{count}" for suffix, count in mapping.items() if count)
+    return zlib.compress(lines.encode("ascii"))
+
+
+def _decode_range(body: bytes) -> Dict[str, int]:
+    result: Dict[str, int] = {}
+    for line in zlib.decompress(body).decode("ascii").splitlines():
+        suffix, count = line.split(":", 1)
+        result[suffix] = int(count)
+    return result
+
+
+class SQLiteRangeStore:
+    """Persistent HIBP range cache kept in a SQLite file.
+
+    Each prefix is stored with the time it was fetched. Entries older than
+    ``ttl`` seconds (``None`` keeps them forever) are treated as missing, and
+    once more than ``max_entries`` prefixes are stored the oldest fetches are
+    dropped. The database runs in WAL mode with one connection per thread and
+    process, so several workers can read and write the same file at once.
+    Stores pickle by path and settings, for use in worker processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_entries: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = os.fspath(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, prefix: str) -> Optional[Dict[str, int]]:
+        """Return the stored range for ``prefix``, or ``None`` if absent or expired."""
+        row = self._connection().execute("SELECT fetched_at, body FROM ranges WHERE prefix = ?", (prefix,)).fetchone()
+        if row is None:
+            return None
+        fetched_at, body = row
+        if self.ttl is not None and self.clock() - fetched_at > self.ttl:
+            return None
+        return _decode_range(body)
+
+    def put(self, prefix: str, mapping: Dict[str, int]) -> None:
+        """Store a freshly fetched range and enforce ``max_entries``."""
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO ranges (prefix, fetched_at, body) VALUES (?, ?, ?)",
+                (prefix, self.clock(), _encode_range(mapping)),
+            )
+            if self.max_entries is not None:
+                connection.execute(
+                    "DELETE FROM ranges WHERE prefix IN "
+                    "(SELECT prefix FROM ranges ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._connection() as connection:
+            cursor = connection.execute("DELETE FROM ranges WHERE fetched_at < ?", (self.clock() - self.ttl,))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM ranges").fetchone()[0]
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __getstate__(self) -> Dict[str, object]:
+        return {"path": self.path, "ttl": self.ttl, "max_entries": self.max_entries, "clock": self.clock}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
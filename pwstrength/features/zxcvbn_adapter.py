@@ -1,22 +1,26 @@
 from __future__ import annotations
 
-from typing import Dict
-
-try:
-    from zxcvbn import zxcvbn as _zxcvbn_impl
-except ImportError as exc:  # pragma: no cover
-    _ZXCVBN_ERROR = exc
-    _zxcvbn_impl = None
-else:
-    _ZXCVBN_ERROR = None
+from typing import Any, Dict, Mapping
 
 
 def zxcvbn_features(password: str) -> Dict[str, object]:
     """Return select zxcvbn metrics for the candidate."""
-    if _zxcvbn_impl is None:  # pragma: no cover
-        raise RuntimeError("The 'zxcvbn' package is required for zxcvbn_features.") from _ZXCVBN_ERROR
+    # Imported on first use: the package builds its dictionaries on import.
+    try:
+        from zxcvbn import zxcvbn as _zxcvbn_impl
+    except ImportError as exc:  # pragma: no cover
+        raise RuntimeError("The 'zxcvbn' package is required for zxcvbn_features.") from exc
+
+    return zxcvbn_features_from_result(_zxcvbn_impl(password or ""))
+
+
+def zxcvbn_features_from_result(result: Mapping[str, Any]) -> Dict[str, object]:
+    """Return the zxcvbn metrics from a zxcvbn-style result dict.
 
-    result = _zxcvbn_impl(password or "")
+    ``result`` needs ``score``, ``guesses`` and ``feedback`` keys, as returned by
+    ``zxcvbn.zxcvbn`` or by ``aadi_adapters.zxcvbn_result`` when the Aadi match
+    pass is shared.
+    """
     feedback = result.get("feedback", {}) or {}
     warning = feedback.get("warning") or ""
     suggestions = " ".join(feedback.get("suggestions", []) or [])
@@ -2,17 +2,11 @@ from __future__ import annotations
 
 from typing import Iterable, Sequence, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from sklearn.calibration import CalibrationDisplay
-from sklearn.metrics import (
-    PrecisionRecallDisplay,
-    RocCurveDisplay,
-    average_precision_score,
-    brier_score_loss,
-    roc_auc_score,
-)
+from sklearn.metrics import average_precision_score, brier_score_loss, roc_auc_score
+
+# matplotlib and the sklearn display classes load on the first plot call.
 
 
 def label_from_count(count: int, tau: int = 10) -> int:
@@ -47,6 +41,9 @@ def metrics_over_thresholds(
 
 def plot_roc(y_true: Iterable[int], y_score: Iterable[float], ax=None):
     """Plot ROC curve for a given set of scores."""
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import RocCurveDisplay
+
     ax = ax or plt.gca()
     RocCurveDisplay.from_predictions(y_true, y_score, ax=ax)
     ax.set_title("ROC Curve")
@@ -54,6 +51,9 @@ def plot_roc(y_true: Iterable[int], y_score: Iterable[float], ax=None):
 
 
 def plot_pr(y_true: Iterable[int], y_score: Iterable[float], ax=None):
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import PrecisionRecallDisplay
+
     ax = ax or plt.gca()
     PrecisionRecallDisplay.from_predictions(y_true, y_score, ax=ax)
     ax.set_title("Precision-Recall Curve")
@@ -61,6 +61,9 @@ def plot_pr(y_true: Iterable[int], y_score: Iterable[float], ax=None):
 
 
 def plot_calibration(y_true: Iterable[int], y_prob: Iterable[float], ax=None, n_bins: int = 10):
+    import matplotlib.pyplot as plt
+    from sklearn.calibration import CalibrationDisplay
+
     ax = ax or plt.gca()
     CalibrationDisplay.from_predictions(y_true, y_prob, n_bins=n_bins, strategy="quantile", ax=ax)
     ax.set_title("Calibration")
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import math
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
+
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
 
 FEATURE_COLUMNS = ["H_bits", "log_count", "log10_zxcvbn_guesses"]
 
@@ -50,6 +52,8 @@ def _build_feature_matrix(df: pd.DataFrame) -> np.ndarray:
 
 def fit_logistic(df: pd.DataFrame, labels: Iterable[int]) -> LogisticRegression:
     """Fit an interpretable logistic baseline using selected features."""
+    from sklearn.linear_model import LogisticRegression
+
     X = _build_feature_matrix(df)
     y = np.array([int(v) for v in labels], dtype=int)
     model = LogisticRegression(max_iter=1000, solver="liblinear")
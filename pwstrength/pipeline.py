@@ -0,0 +1,472 @@
+from __future__ import annotations
+
+import copy
+import traceback
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .adapters import aadi_adapters
+from .features.entropy import length_and_classes_batch, shannon_entropy_batch
+from .features.hibp_client import HIBPPrevalence, get_prevalence_batch
+from .features.zxcvbn_adapter import zxcvbn_features, zxcvbn_features_from_result
+from .models.hybrid import hybrid_score_v0
+from .schema import (
+    CLASS_NAMES,
+    FEATURE_COLUMNS,
+    NESTED_COLUMNS,
+    NESTED_VALUE_KEYS,
+    SCENARIOS,
+    encode_sequence,
+    main_pattern,
+)
+
+Values = Dict[str, List[Any]]
+
+
+@dataclass(frozen=True)
+class FeatureOptions:
+    """Per-call settings the stages read."""
+
+    online: bool = False
+    tau: int = 10
+    session: Any = None
+    share_matches: bool = False
+    nested: bool = False
+    hibp_store: Any = None
+    hibp_dump: Any = None
+    hibp_bloom: Any = None
+    hibp_cache: Any = None
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of the feature pipeline.
+
+    ``run`` receives the batch of passwords, the values provided so far by the
+    stages named in ``requires`` and the call options, and returns one list per
+    key in ``provides``, aligned with the passwords. Keys are output columns
+    (see ``pwstrength.schema``) or ``_``-prefixed intermediates shared between
+    stages.
+    """
+
+    name: str
+    provides: Tuple[str, ...]
+    requires: Tuple[str, ...]
+    run: Callable[[List[str], Values, FeatureOptions], Values]
+
+
+def _safe_log_count(prevalence: HIBPPrevalence | None) -> float:
+    if not prevalence:
+        return 0.0
+    return prevalence.log_count
+
+
+def _run_classes(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    lengths, counts, flags = length_and_classes_batch(passwords)
+    columns = {name: flags[name].tolist() for name in CLASS_NAMES}
+    values = {
+        "length": lengths.tolist(),
+        "classes": counts.tolist(),
+        "class_flags": [dict(zip(CLASS_NAMES, row)) for row in zip(*columns.values())],
+    }
+    for name in CLASS_NAMES:
+        values[f"class_{name}"] = columns[name]
+    return values
+
+
+def _run_entropy(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return {"H_bits": shannon_entropy_batch(passwords).tolist()}
+
+
+def _run_aadi_matches(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return {"_aadi_matches": [aadi_adapters.match_patterns(password) for password in passwords]}
+
+
+def _run_aadi_guesses(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    infos = [
+        aadi_adapters.estimate_guesses(password, matches)
+        for password, matches in zip(passwords, values["_aadi_matches"])
+    ]
+    return {
+        "_aadi_guess_info": infos,
+        "aadi_guesses": [info["guesses"] for info in infos],
+        "aadi_score": [info["score"] for info in infos],
+        "aadi_pattern": [main_pattern(info["sequence"]) for info in infos],
+        "aadi_sequence": [encode_sequence(info["sequence"]) for info in infos],
+    }
+
+
+def _run_aadi_records(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return {
+        "aadi_sequence_records": [
+            [match.to_dict() for match in info["sequence"]] for info in values["_aadi_guess_info"]
+        ]
+    }
+
+
+def _run_aadi_feedback(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return {
+        "aadi_feedback": [
+            aadi_adapters.human_feedback(password, info["matches"], score=info["score"])
+            for password, info in zip(passwords, values["_aadi_guess_info"])
+        ]
+    }
+
+
+def _zxcvbn_columns(features: List[Dict[str, object]]) -> Values:
+    return {name: [row[name] for row in features] for name in ("zxcvbn_score", "zxcvbn_guesses", "zxcvbn_feedback")}
+
+
+def _run_zxcvbn(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return _zxcvbn_columns([zxcvbn_features(password) for password in passwords])
+
+
+def _run_zxcvbn_shared(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return _zxcvbn_columns(
+        [zxcvbn_features_from_result(aadi_adapters.zxcvbn_result(info)) for info in values["_aadi_guess_info"]]
+    )
+
+
+def _run_hibp(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    if options.hibp_dump is not None:
+        bloom = options.hibp_bloom
+        prevalences = [
+            options.hibp_dump.get_prevalence(password)
+            if bloom is None or bloom.might_contain(password)
+            else HIBPPrevalence(count=0, log_count=0.0)
+            for password in passwords
+        ]
+        return {
+            "hibp_count": [prevalence.count for prevalence in prevalences],
+            "log_count": [prevalence.log_count for prevalence in prevalences],
+            "prevalence_mode": ["dump"] * len(passwords),
+        }
+    if not options.online:
+        return {
+            "hibp_count": [0] * len(passwords),
+            "log_count": [0.0] * len(passwords),
+            "prevalence_mode": ["offline"] * len(passwords),
+        }
+    counts, log_counts, modes = [], [], []
+    for prevalence in get_prevalence_batch(
+        passwords,
+        session=options.session,
+        store=options.hibp_store,
+        bloom=options.hibp_bloom,
+        cache=options.hibp_cache,
+    ):
+        counts.append(prevalence.count if prevalence else 0)
+        log_counts.append(_safe_log_count(prevalence))
+        modes.append("online" if prevalence else "error")
+    return {"hibp_count": counts, "log_count": log_counts, "prevalence_mode": modes}
+
+
+def _run_hybrid(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return {
+        "HybridScore_v0": [
+            hybrid_score_v0({"H_bits": h_bits, "zxcvbn_guesses": guesses, "log_count": log_count})
+            for h_bits, guesses, log_count in zip(values["H_bits"], values["zxcvbn_guesses"], values["log_count"])
+        ]
+    }
+
+
+def _run_label(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return {"label_breached": [int((count or 0) >= options.tau) for count in values["hibp_count"]]}
+
+
+def _run_tau(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    return {"tau": [options.tau] * len(passwords)}
+
+
+def _run_crack_times(passwords: List[str], values: Values, options: FeatureOptions) -> Values:
+    crack_info = aadi_adapters.crack_times_batch(values["aadi_guesses"])
+    displays = crack_info["crack_times_display"]
+    result = {
+        "crack_times_display": [
+            {scenario: display[index] for scenario, display in displays.items()} for index in range(len(passwords))
+        ]
+    }
+    for scenario, seconds in crack_info["crack_times_seconds"].items():
+        result[f"crack_seconds_{scenario}"] = seconds.tolist()
+    return result
+
+
+STAGES: Tuple[Stage, ...] = (
+    Stage(
+        "classes",
+        ("length", "classes", "class_flags", *(f"class_{name}" for name in CLASS_NAMES)),
+        (),
+        _run_classes,
+    ),
+    Stage("entropy", ("H_bits",), (), _run_entropy),
+    Stage("aadi_matches", ("_aadi_matches",), (), _run_aadi_matches),
+    Stage(
+        "aadi_guesses",
+        ("_aadi_guess_info", "aadi_guesses", "aadi_score", "aadi_pattern", "aadi_sequence"),
+        ("aadi_matches",),
+        _run_aadi_guesses,
+    ),
+    Stage("aadi_records", ("aadi_sequence_records",), ("aadi_guesses",), _run_aadi_records),
+    Stage("aadi_feedback", ("aadi_feedback",), ("aadi_guesses",), _run_aadi_feedback),
+    Stage("zxcvbn", ("zxcvbn_score", "zxcvbn_guesses", "zxcvbn_feedback"), (), _run_zxcvbn),
+    Stage("hibp", ("hibp_count", "log_count", "prevalence_mode"), (), _run_hibp),
+    Stage("hybrid", ("HybridScore_v0",), ("entropy", "zxcvbn", "hibp"), _run_hybrid),
+    Stage("label", ("label_breached",), ("hibp",), _run_label),
+    Stage("tau", ("tau",), (), _run_tau),
+    Stage(
+        "crack_times",
+        ("crack_times_display", *(f"crack_seconds_{scenario}" for scenario in SCENARIOS)),
+        ("aadi_guesses",),
+        _run_crack_times,
+    ),
+)
+
+# Swapped in for "zxcvbn" when ``share_matches`` is set.
+SHARED_ZXCVBN_STAGE = Stage(
+    "zxcvbn", ("zxcvbn_score", "zxcvbn_guesses", "zxcvbn_feedback"), ("aadi_guesses",), _run_zxcvbn_shared
+)
+
+
+def _stage_table(options: FeatureOptions) -> Dict[str, Stage]:
+    table = {stage.name: stage for stage in STAGES}
+    if options.share_matches:
+        table["zxcvbn"] = SHARED_ZXCVBN_STAGE
+    return table
+
+
+def resolve_columns(columns: Optional[Iterable[str]], nested: bool = False) -> Tuple[str, ...]:
+    """Return the requested output columns in frame order, always led by ``pw``."""
+    layout = NESTED_COLUMNS if nested else FEATURE_COLUMNS
+    if columns is None:
+        return layout
+    if isinstance(columns, str):
+        columns = [columns]
+    requested = set(columns)
+    unknown = requested.difference(layout)
+    if unknown:
+        raise ValueError(f"Unknown feature columns {sorted(unknown)}; expected a subset of {list(layout)}")
+    requested.add("pw")
+    return tuple(name for name in layout if name in requested)
+
+
+def _value_keys(columns: Sequence[str], options: FeatureOptions) -> List[str]:
+    if not options.nested:
+        return list(columns)
+    return [NESTED_VALUE_KEYS.get(column, column) for column in columns]
+
+
+def plan_stages(columns: Sequence[str], options: FeatureOptions) -> List[Stage]:
+    """Return the stages needed for ``columns``, dependencies first."""
+    table = _stage_table(options)
+    producers = {key: stage for stage in table.values() for key in stage.provides}
+    plan: List[Stage] = []
+    seen = set()
+
+    def visit(stage: Stage) -> None:
+        if stage.name in seen:
+            return
+        seen.add(stage.name)
+        for dependency in stage.requires:
+            visit(table[dependency])
+        plan.append(stage)
+
+    for key in _value_keys(columns, options):
+        if key in producers:
+            visit(producers[key])
+    return plan
+
+
+def run_stages(passwords: List[str], columns: Sequence[str], options: FeatureOptions) -> Values:
+    """Run the planned stages over one batch and return the requested columns."""
+    values: Values = {"pw": passwords}
+    for stage in plan_stages(columns, options):
+        values.update(stage.run(passwords, values, options))
+    return {column: values[key] for column, key in zip(columns, _value_keys(columns, options))}
+
+
+@dataclass(frozen=True)
+class DedupStats:
+    """How many candidates of a call were repeats of an earlier one."""
+
+    candidates: int
+    distinct: int
+
+    @property
+    def hits(self) -> int:
+        return self.candidates - self.distinct
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.candidates if self.candidates else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"candidates": self.candidates, "distinct": self.distinct, "hit_ratio": self.hit_ratio}
+
+
+def dedupe_candidates(passwords: List[str]) -> Tuple[List[str], List[int], DedupStats]:
+    """Return the distinct passwords in first-seen order and each input's index into them."""
+    positions: Dict[str, int] = {}
+    inverse = [positions.setdefault(password, len(positions)) for password in passwords]
+    return list(positions), inverse, DedupStats(candidates=len(passwords), distinct=len(positions))
+
+
+def expand(values: Values, inverse: List[int]) -> Values:
+    """Fan per-distinct values back out to input order.
+
+    Repeats of dict and list cells (the nested layout) are copied so rows never
+    share mutable objects.
+    """
+    expanded: Values = {}
+    for column, column_values in values.items():
+        if column_values and isinstance(column_values[0], (dict, list)):
+            seen = set()
+            cells = []
+            for index in inverse:
+                cell = column_values[index]
+                cells.append(copy.deepcopy(cell) if index in seen else cell)
+                seen.add(index)
+            expanded[column] = cells
+        else:
+            expanded[column] = [column_values[index] for index in inverse]
+    return expanded
+
+
+@dataclass(frozen=True)
+class ChunkFailure:
+    """A chunk of a parallel build that did not complete.
+
+    ``start`` and ``stop`` bound the chunk in the list that was split, which
+    is the deduplicated one when ``build_features`` dedupes; ``positions``
+    are the input indexes of the candidates it held.
+    """
+
+    index: int
+    start: int
+    stop: int
+    error: str
+    positions: Tuple[int, ...] = ()
+
+
+def _describe_positions(positions: Sequence[int], limit: int = 5) -> str:
+    if positions and list(positions) == list(range(positions[0], positions[-1] + 1)):
+        return f"[{positions[0]}:{positions[-1] + 1})"
+    shown = ", ".join(str(position) for position in positions[:limit])
+    return f"{{{shown}{', ...' if len(positions) > limit else ''}}}"
+
+
+class ChunkError(RuntimeError):
+    """Raised when chunks of a parallel feature build fail.
+
+    ``failures`` lists every failed chunk with the input positions of its
+    candidates and the worker's traceback.
+    """
+
+    def __init__(self, failures: List[ChunkFailure]) -> None:
+        self.failures = failures
+        ranges = ", ".join(f"#{failure.index} {_describe_positions(failure.positions)}" for failure in failures)
+        super().__init__(f"{len(failures)} feature chunk(s) failed at input {ranges}\n{failures[0].error}")
+
+    def remap(self, inverse: Sequence[int]) -> ChunkError:
+        """Return the error for a deduplicated build, with ``positions`` in the original input.
+
+        ``inverse`` is the input-to-distinct index list from ``dedupe_candidates``.
+        """
+        failures = [
+            replace(
+                failure,
+                positions=tuple(
+                    position for position, distinct in enumerate(inverse) if failure.start <= distinct < failure.stop
+                ),
+            )
+            for failure in self.failures
+        ]
+        return ChunkError(failures)
+
+
+# The options of the build a worker process serves, set once by _init_worker so
+# caches and filters in them are unpickled per worker rather than per chunk.
+_WORKER_OPTIONS: Optional[FeatureOptions] = None
+
+
+def _init_worker(options: FeatureOptions) -> None:
+    global _WORKER_OPTIONS
+    _WORKER_OPTIONS = options
+    aadi_adapters.warm_up()
+
+
+def _run_chunk(passwords: List[str], columns: Sequence[str]) -> Tuple[Optional[Values], Optional[str]]:
+    # Errors travel back as text: worker exceptions are not always picklable.
+    try:
+        return run_stages(passwords, columns, _WORKER_OPTIONS), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+class WorkerPool:
+    """Process pool for parallel builds that share one ``FeatureOptions``.
+
+    Workers start, receive ``options`` and load the student modules and the
+    dictionary index once, so one pool can serve every batch of a build
+    (``iter_features`` does this). Close it, or use it as a context manager.
+    """
+
+    def __init__(self, options: FeatureOptions, workers: int) -> None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.options = options
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,))
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> WorkerPool:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def run_stages_parallel(
+    passwords: List[str],
+    columns: Sequence[str],
+    options: FeatureOptions,
+    workers: int,
+    chunksize: int,
+    pool: Optional[WorkerPool] = None,
+) -> Values:
+    """Run ``run_stages`` over ``chunksize`` slices in a pool of ``workers`` processes.
+
+    Without ``pool`` a ``WorkerPool`` is opened for this call only; an open
+    one must have been created for the same ``options``. The chunks are
+    reassembled in input order; failed chunks raise ``ChunkError``.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if pool is None:
+        with WorkerPool(options, workers) as own_pool:
+            return run_stages_parallel(passwords, columns, options, workers, chunksize, pool=own_pool)
+    if pool.options != options:
+        raise ValueError("pool was opened for different feature options")
+    bounds = [(start, min(start + chunksize, len(passwords))) for start in range(0, len(passwords), chunksize)]
+    values: Values = {column: [] for column in columns}
+    failures: List[ChunkFailure] = []
+    futures = [pool.executor.submit(_run_chunk, passwords[start:stop], columns) for start, stop in bounds]
+    for index, (future, (start, stop)) in enumerate(zip(futures, bounds)):
+        try:
+            chunk, error = future.result()
+        except Exception as exc:  # the worker process died
+            chunk, error = None, f"{type(exc).__name__}: {exc}"
+        if error is not None:
+            failures.append(
+                ChunkFailure(index=index, start=start, stop=stop, error=error, positions=tuple(range(start, stop)))
+            )
+            continue
+        if not failures:
+            for column in columns:
+                values[column].extend(chunk[column])
+    if failures:
+        raise ChunkError(failures)
+    return values
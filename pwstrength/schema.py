@@ -0,0 +1,158 @@
+"""Column schema of the ``build_features`` frame.
+
+The default frame is flat and typed: every cell is a scalar, so it filters
+quickly and writes to Parquet or CSV without conversion. ``nested=True``
+returns the earlier layout, where ``class_flags``, ``aadi_sequence`` and
+``crack_times_display`` hold dicts and lists; it is kept for compatibility.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, TypedDict
+
+from .features.entropy import CLASS_ORDER
+
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+
+CLASS_NAMES: Tuple[str, ...] = CLASS_ORDER
+# The attack scenarios of the Time Estimates script, spelled out so importing
+# the schema does not load that script (and numpy); a test keeps them in step.
+SCENARIOS: Tuple[str, ...] = (
+    "online_throttling_100_per_hour",
+    "online_no_throttling_10_per_second",
+    "offline_slow_hashing_1e4_per_second",
+    "offline_fast_hashing_1e10_per_second",
+)
+PREVALENCE_MODES: Tuple[str, ...] = ("offline", "online", "error", "dump")
+
+# One-letter codes used by the encoded ``aadi_sequence`` column.
+PATTERN_CODES: Dict[str, str] = {
+    "dictionary": "D",
+    "spatial": "K",
+    "repeat": "R",
+    "sequence": "S",
+    "regex": "X",
+    "date": "T",
+    "bruteforce": "B",
+}
+_CODE_PATTERNS = {code: pattern for pattern, code in PATTERN_CODES.items()}
+
+# Fixed categories of the "category" columns, so every batch shares them.
+CATEGORIES: Dict[str, Tuple[str, ...]] = {
+    "prevalence_mode": PREVALENCE_MODES,
+    "aadi_pattern": tuple(PATTERN_CODES),
+}
+
+# (column, dtype, description) for the flat frame, in column order. A dtype of
+# None leaves the column as pandas infers it (text columns).
+FEATURE_SCHEMA: Tuple[Tuple[str, Optional[str], str], ...] = (
+    ("pw", None, "candidate string"),
+    ("length", "int64", "number of characters"),
+    ("classes", "int64", "number of character classes present"),
+    *((f"class_{name}", "bool", f"contains a {name} character") for name in CLASS_NAMES),
+    ("H_bits", "float64", "Shannon entropy of the string, in bits"),
+    ("zxcvbn_score", "int64", "zxcvbn score, 0-4"),
+    ("zxcvbn_guesses", "float64", "zxcvbn guess estimate"),
+    ("zxcvbn_feedback", None, "zxcvbn warning and suggestions"),
+    ("hibp_count", "int64", "Pwned Passwords count (0 offline without a dump)"),
+    ("log_count", "float64", "log1p(hibp_count)"),
+    ("prevalence_mode", "category", "offline, online, error or dump"),
+    ("aadi_guesses", "float64", "Aadi scorer guess estimate"),
+    ("aadi_score", "int64", "Aadi score, 0-4"),
+    ("aadi_feedback", None, "Aadi warning and suggestions"),
+    ("aadi_pattern", "category", "pattern of the match covering the most characters"),
+    ("aadi_sequence", None, "encoded match sequence, see encode_sequence"),
+    ("HybridScore_v0", "float64", "hybrid baseline score"),
+    ("label_breached", "int64", "1 when hibp_count >= tau"),
+    ("tau", "int64", "label threshold"),
+    *((f"crack_seconds_{scenario}", "float64", f"crack time in seconds, {scenario}") for scenario in SCENARIOS),
+)
+FEATURE_COLUMNS: Tuple[str, ...] = tuple(column for column, _, _ in FEATURE_SCHEMA)
+
+# The compatibility layout, and the pipeline value behind each of its columns
+# where the flat layout uses the same name for something else.
+NESTED_COLUMNS: Tuple[str, ...] = (
+    "pw",
+    "length",
+    "classes",
+    "class_flags",
+    "H_bits",
+    "zxcvbn_score",
+    "zxcvbn_guesses",
+    "zxcvbn_feedback",
+    "hibp_count",
+    "log_count",
+    "prevalence_mode",
+    "aadi_guesses",
+    "aadi_score",
+    "aadi_feedback",
+    "aadi_sequence",
+    "HybridScore_v0",
+    "label_breached",
+    "tau",
+    "crack_times_display",
+)
+NESTED_VALUE_KEYS: Dict[str, str] = {"aadi_sequence": "aadi_sequence_records"}
+
+
+class FeatureRecord(TypedDict):
+    """One row of the compatibility layout, as returned by ``core.score_record``."""
+
+    pw: str
+    length: int
+    classes: int
+    class_flags: Dict[str, bool]
+    H_bits: float
+    zxcvbn_score: int
+    zxcvbn_guesses: float
+    zxcvbn_feedback: str
+    hibp_count: int
+    log_count: float
+    prevalence_mode: str
+    aadi_guesses: float
+    aadi_score: int
+    aadi_feedback: str
+    aadi_sequence: List[Dict[str, Any]]
+    HybridScore_v0: float
+    label_breached: int
+    tau: int
+    crack_times_display: Dict[str, str]
+
+
+def encode_sequence(sequence: Sequence) -> str:
+    """Encode a match sequence as ``"<code><i>-<j>"`` tokens joined by spaces.
+
+    ``"lovelove2015!"`` becomes ``"R0-7 B8-12"``; see ``PATTERN_CODES``.
+    """
+    return " ".join(f"{PATTERN_CODES[match['pattern']]}{match['i']}-{match['j']}" for match in sequence)
+
+
+def decode_sequence(encoded: str) -> List[Tuple[str, int, int]]:
+    """Return ``(pattern, i, j)`` triples from an encoded ``aadi_sequence``."""
+    triples = []
+    for token in encoded.split():
+        start, end = token[1:].split("-")
+        triples.append((_CODE_PATTERNS[token[0]], int(start), int(end)))
+    return triples
+
+
+def main_pattern(sequence: Sequence) -> Optional[str]:
+    """Return the pattern of the match covering the most characters (first on ties)."""
+    best = None
+    for match in sequence:
+        if best is None or match["j"] - match["i"] > best["j"] - best["i"]:
+            best = match
+    return best["pattern"] if best is not None else None
+
+
+def apply_schema(frame: pd.DataFrame) -> pd.DataFrame:
+    """Cast the columns of a flat frame to their ``FEATURE_SCHEMA`` dtypes."""
+    import pandas as pd
+
+    dtypes: Dict[str, Any] = {}
+    for column, dtype, _ in FEATURE_SCHEMA:
+        if dtype is None or column not in frame:
+            continue
+        dtypes[column] = pd.CategoricalDtype(CATEGORIES[column]) if dtype == "category" else dtype
+    return frame.astype(dtypes)
@@ -0,0 +1,183 @@
+import pickle
+
+import pandas as pd
+import pytest
+from zxcvbn import zxcvbn
+
+from pwstrength import build_features, core, iter_features, pipeline, score, score_record
+from pwstrength.adapters import aadi_adapters
+from pwstrength.features import hibp_client
+from pwstrength.pipeline import ChunkError, FeatureOptions, plan_stages
+from pwstrength.schema import (
+    CLASS_NAMES,
+    FEATURE_COLUMNS,
+    FEATURE_SCHEMA,
+    NESTED_COLUMNS,
+    decode_sequence,
+    main_pattern,
+)
+from pwstrength.features.zxcvbn_adapter import zxcvbn_features
+
+ZXCVBN_COLUMNS = ["zxcvbn_score", "zxcvbn_guesses", "zxcvbn_feedback"]
+
+CANDIDATES = [
+    "a",
+    "password",
+    "Tr0ub4dor&3",
+    "correcthorsebatterystaple",
+    "lovelove2015!",
+    "qwertyuiop19871231zyx",
+    "x9$kQ!2mZ#7vL@4p",
+    "P@$$w0rd|7!1+5%2(0",
+    "abcdefabcdef",
+    "JohnSmith1987",
+]
+
+
+def test_shared_matches_reproduce_zxcvbn_package():
+    shared = build_features(CANDIDATES, share_matches=True)
+    for row, candidate in zip(shared.to_dict("records"), CANDIDATES):
+        assert {column: row[column] for column in ZXCVBN_COLUMNS} == zxcvbn_features(candidate)
+        assert row["zxcvbn_guesses"] == float(zxcvbn(candidate)["guesses"])
+
+
+def test_column_subset_runs_only_needed_stages(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("stage should have been skipped")
+
+    for name in ("match_patterns", "human_feedback", "crack_times_batch"):
+        monkeypatch.setattr(aadi_adapters, name, fail)
+    frame = build_features(["Tr0ub4dor&3", "password"], columns=["H_bits", "hibp_count"])
+    assert list(frame.columns) == ["pw", "H_bits", "hibp_count"]
+    assert frame["hibp_count"].tolist() == [0, 0]
+
+
+def test_plan_orders_dependencies_first():
+    plan = [stage.name for stage in plan_stages(["zxcvbn_score", "aadi_feedback"], FeatureOptions(share_matches=True))]
+    assert plan == ["aadi_matches", "aadi_guesses", "zxcvbn", "aadi_feedback"]
+    with pytest.raises(ValueError):
+        build_features(["x"], columns=["not_a_column"])
+
+
+def test_parallel_build_matches_serial_order():
+    serial = build_features(CANDIDATES, share_matches=True)
+    parallel = build_features(CANDIDATES, share_matches=True, workers=2, chunksize=3)
+    assert parallel.equals(serial)
+
+
+def test_parallel_build_reports_failed_chunks():
+    with pytest.raises(ChunkError) as info:
+        build_features(["a", "b", 7, "c"], columns=["length"], workers=2, chunksize=2)
+    [failure] = info.value.failures
+    assert (failure.index, failure.start, failure.stop, failure.positions) == (1, 2, 4, (2, 3))
+    assert "TypeError" in failure.error
+
+
+def test_parallel_failures_point_at_input_positions_after_dedupe():
+    with pytest.raises(ChunkError) as info:
+        build_features(["a", "a", "a", "b", 7, "c"], columns=["length"], workers=2, chunksize=2)
+    [failure] = info.value.failures
+    assert (failure.start, failure.stop, failure.positions) == (2, 4, (4, 5))
+    assert "at input #1 [4:6)" in str(info.value)
+
+
+def test_flat_frame_follows_schema_and_nested_view_is_kept():
+    flat = build_features(CANDIDATES, share_matches=True)
+    assert list(flat.columns) == list(FEATURE_COLUMNS)
+    for column, dtype, _ in FEATURE_SCHEMA:
+        if dtype is not None:
+            assert flat[column].dtype == dtype, column
+    nested = build_features(CANDIDATES, share_matches=True, nested=True)
+    assert list(nested.columns) == list(NESTED_COLUMNS)
+    for flat_row, nested_row in zip(flat.to_dict("records"), nested.to_dict("records")):
+        assert {name: flat_row[f"class_{name}"] for name in CLASS_NAMES} == nested_row["class_flags"]
+        spans = [(match["pattern"], match["i"], match["j"]) for match in nested_row["aadi_sequence"]]
+        assert decode_sequence(flat_row["aadi_sequence"]) == spans
+        assert flat_row["aadi_pattern"] == main_pattern(nested_row["aadi_sequence"])
+
+
+def test_duplicates_are_scored_once_and_fanned_out(monkeypatch):
+    candidates = ["password", "Tr0ub4dor&3", "password", "password", "qwerty"]
+    seen = []
+    match_patterns = aadi_adapters.match_patterns
+
+    def counting_match_patterns(password):
+        seen.append(password)
+        return match_patterns(password)
+
+    monkeypatch.setattr(aadi_adapters, "match_patterns", counting_match_patterns)
+    frame = build_features(candidates, share_matches=True)
+    assert sorted(seen) == ["Tr0ub4dor&3", "password", "qwerty"]
+    assert frame.attrs["dedup"] == {"candidates": 5, "distinct": 3, "hit_ratio": 0.4}
+    assert frame.equals(build_features(candidates, share_matches=True, dedupe=False))
+
+    nested = build_features(candidates, columns=["class_flags"], nested=True)
+    assert nested["class_flags"][0] == nested["class_flags"][2]
+    assert nested["class_flags"][0] is not nested["class_flags"][2]
+
+
+def test_score_record_matches_frame_row_and_frame_is_lazy():
+    record = score_record("Tr0ub4dor&3", share_matches=True)
+    assert record == build_features(["Tr0ub4dor&3"], share_matches=True, nested=True).iloc[0].to_dict()
+
+    result = score("Tr0ub4dor&3", share_matches=True)
+    assert "features" not in result.__dict__
+    assert result.to_dict()["aadi_score"] == record["aadi_score"]
+    assert result.features.iloc[0].to_dict() == record
+
+
+class _RangeSession:
+    def __init__(self, text):
+        self.text = text
+        self.urls = []
+
+    def get(self, url, headers=None, timeout=10):
+        self.urls.append(url)
+        return type("Response", (), {"status_code": 200, "text": self.text})()
+
+
+def test_online_build_uses_batched_prevalence():
+    hibp_client.clear_cache()
+    session = _RangeSession("1E4C9B93F3F0682250B6CF8331B7EE68FD8:12")
+    frame = build_features(
+        ["password", "hunter2", "password"],
+        online=True,
+        session=session,
+        columns=["hibp_count", "prevalence_mode", "label_breached"],
+        dedupe=False,
+    )
+    assert frame["hibp_count"].tolist() == [12, 0, 12]
+    assert frame["prevalence_mode"].tolist() == ["online"] * 3
+    assert frame["label_breached"].tolist() == [1, 0, 1]
+    assert len(session.urls) == 2
+
+
+def test_iter_features_reuses_one_worker_pool(monkeypatch):
+    opened = []
+
+    class CountingPool(pipeline.WorkerPool):
+        def __init__(self, options, workers):
+            opened.append(workers)
+            super().__init__(options, workers)
+
+    monkeypatch.setattr(core, "WorkerPool", CountingPool)
+    options = dict(share_matches=True, columns=["aadi_score", "zxcvbn_score"])
+    frames = list(iter_features(CANDIDATES * 2, batch_size=4, workers=2, chunksize=2, **options))
+    assert len(frames) > 2 and opened == [2]
+    serial = pd.concat(list(iter_features(CANDIDATES * 2, batch_size=4, **options)))
+    assert pd.concat(frames).equals(serial)
+
+
+def test_worker_keeps_one_options_copy_across_chunks(monkeypatch):
+    monkeypatch.setattr(pipeline.aadi_adapters, "warm_up", lambda: None)
+    cache = hibp_client.RangeCache()
+    session = _RangeSession("1E4C9B93F3F0682250B6CF8331B7EE68FD8:12")
+    options = FeatureOptions(online=True, session=session, hibp_cache=cache)
+    monkeypatch.setattr(pipeline, "_WORKER_OPTIONS", None)
+    pipeline._init_worker(pickle.loads(pickle.dumps(options)))
+    worker_cache = pipeline._WORKER_OPTIONS.hibp_cache
+    for chunk in (["password"], ["password", "hunter2"]):
+        values, error = pipeline._run_chunk(chunk, ["hibp_count"])
+        assert error is None and values["hibp_count"][0] == 12
+    assert (worker_cache.stats().hits, worker_cache.stats().misses) == (1, 2)
+    assert cache.stats().misses == 0
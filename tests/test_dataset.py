@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from pwstrength import build_features, iter_features
+from pwstrength.dataset import write_features
+
+CANDIDATES = ["passw0rd", "CorrectHorseBatteryStaple", "Tr0ub4dor&3", "qwerty2015", "x9$kQ!2mZ#7vL@4p"]
+
+
+def test_iter_features_batches_concatenate_to_full_frame():
+    frames = list(iter_features(CANDIDATES, batch_size=2, share_matches=True))
+    assert [len(frame) for frame in frames] == [2, 2, 1]
+    assert pd.concat(frames).equals(build_features(CANDIDATES, share_matches=True))
+
+
+def test_iter_features_consumes_input_lazily():
+    consumed = []
+
+    def candidates():
+        for candidate in CANDIDATES:
+            consumed.append(candidate)
+            yield candidate
+
+    next(iter_features(candidates(), batch_size=2, columns=["length"]))
+    assert consumed == CANDIDATES[:2]
+
+
+def test_write_features_appends_parquet_batches(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "data" / "features.parquet"
+    assert write_features(CANDIDATES, path, batch_size=2, columns=["H_bits", "class_flags"], nested=True) == len(CANDIDATES)
+    written = pd.read_parquet(path)
+    assert written["pw"].tolist() == CANDIDATES
+    assert written["H_bits"].tolist() == build_features(CANDIDATES, columns=["H_bits"])["H_bits"].tolist()
+
+
+def test_write_features_appends_csv_batches(tmp_path):
+    path = tmp_path / "features.csv"
+    write_features(CANDIDATES, path, batch_size=3, columns=["length"])
+    assert pd.read_csv(path)["length"].tolist() == [len(candidate) for candidate in CANDIDATES]
+    with pytest.raises(ValueError):
+        write_features(CANDIDATES, tmp_path / "features.txt")
@@ -1,4 +1,9 @@
-from pwstrength.features.entropy import length_and_classes, shannon_entropy_total
+from pwstrength.features.entropy import (
+    length_and_classes,
+    length_and_classes_batch,
+    shannon_entropy_batch,
+    shannon_entropy_total,
+)
 
 
 def test_entropy_empty_string():
@@ -24,3 +29,19 @@ def test_length_and_classes_flags():
     assert length == 4
     assert class_count >= 3
     assert flags["lower"] and flags["upper"] and flags["digit"]
+
+
+BATCH_CANDIDATES = ["", "a", "Aa1!", "aaaa", "abcabcab", "Ünïcødé 123", "ΩωΣ", "全角ＡＢ１", "😀x😀", " \t \n", "٣٤٥"]
+
+
+def test_batch_entropy_matches_scalar_exactly():
+    batch = shannon_entropy_batch(BATCH_CANDIDATES)
+    assert batch.tolist() == [shannon_entropy_total(candidate) for candidate in BATCH_CANDIDATES]
+
+
+def test_batch_classes_match_scalar():
+    lengths, class_counts, flags = length_and_classes_batch(BATCH_CANDIDATES)
+    for index, candidate in enumerate(BATCH_CANDIDATES):
+        length, class_count, scalar_flags = length_and_classes(candidate)
+        assert (lengths[index], class_counts[index]) == (length, class_count)
+        assert {name: bool(values[index]) for name, values in flags.items()} == scalar_flags
@@ -0,0 +1,87 @@
+import hashlib
+import pickle
+
+import pytest
+
+from pwstrength.cli import pwscore_cli
+from pwstrength.core import build_features
+from pwstrength.features import hibp_client
+from pwstrength.features.hibp_bloom import BloomFilter, optimal_size
+from pwstrength.features.hibp_dump import PwnedDump, convert_dump
+
+WORDS = [f"breached-{number}" for number in range(5000)]
+
+
+class RecordingSession:
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, headers=None, timeout=10):
+        self.urls.append(url)
+        suffix = hashlib.sha1(b"breached-1").hexdigest().upper()[5:]
+        return type("Response", (), {"status_code": 200, "text": f"{suffix}:4"})()
+
+
+@pytest.fixture(scope="module")
+def dump(tmp_path_factory):
+    root = tmp_path_factory.mktemp("bloom")
+    lines = sorted(f"{hashlib.sha1(word.encode()).hexdigest().upper()}:{number + 1}" for number, word in enumerate(WORDS))
+    (root / "dump.txt").write_text("\n".join(lines) + "\n")
+    convert_dump(root / "dump.txt", root / "pwned.bin")
+    return PwnedDump(root / "pwned.bin")
+
+
+def test_from_dump_matches_scalar_adds_and_fp_rate(dump):
+    bloom = BloomFilter.from_dump(dump, fp_rate=0.01)
+    scalar = BloomFilter(bloom.bit_count, bloom.hash_count)
+    for word in WORDS:
+        scalar.add(word)
+    assert bytes(scalar._bits) == bytes(bloom._bits)
+    assert all(word in bloom for word in WORDS)
+    false_positives = sum(bloom.might_contain(f"clean-{number}") for number in range(20000))
+    assert false_positives / 20000 < 0.02
+    assert bloom.expected_fp_rate == pytest.approx(0.01, rel=0.2)
+
+
+def test_memory_budget_and_save_load(dump, tmp_path):
+    capped = BloomFilter.from_dump(dump, fp_rate=0.001, max_bytes=2048)
+    assert capped.nbytes == 2048
+    assert capped.expected_fp_rate > 0.001
+    capped.save(tmp_path / "pwned.bloom")
+    loaded = BloomFilter.load(tmp_path / "pwned.bloom")
+    assert (loaded.bit_count, loaded.hash_count, loaded.item_count) == (16384, capped.hash_count, len(WORDS))
+    assert all(loaded.might_contain(word) for word in WORDS)
+    with pytest.raises(ValueError):
+        optimal_size(10, fp_rate=1.5)
+
+
+def test_client_skips_lookups_the_filter_rules_out(dump):
+    bloom = BloomFilter.from_dump(dump)
+    hibp_client.clear_cache()
+    session = RecordingSession()
+    assert hibp_client.get_count("definitely-not-breached-xyz", session=session, bloom=bloom) == 0
+    assert session.urls == []
+    results = hibp_client.get_prevalence_batch(["breached-1", "also-clean-abc"], session=session, bloom=bloom)
+    assert [result.count for result in results] == [4, 0]
+    assert len(session.urls) == 1
+
+
+def test_filters_pickle_and_serve_parallel_builds(dump, tmp_path):
+    built = BloomFilter.from_dump(dump)
+    assert bytes(pickle.loads(pickle.dumps(built))._bits) == bytes(built._bits)
+    built.save(tmp_path / "pwned.bloom")
+    loaded = BloomFilter.load(tmp_path / "pwned.bloom")
+    assert len(pickle.dumps(loaded)) < 200
+    assert pickle.loads(pickle.dumps(loaded)).might_contain("breached-7")
+    candidates = ["breached-1", "clean", "breached-2", "breached-1", "other"]
+    options = dict(hibp_dump=dump, hibp_bloom=loaded, columns=["hibp_count", "prevalence_mode"])
+    parallel = build_features(candidates, workers=2, chunksize=2, **options)
+    assert parallel.equals(build_features(candidates, **options))
+    assert parallel["hibp_count"].tolist() == [2, 0, 3, 2, 0]
+
+
+def test_cli_rejects_filter_without_prevalence_source(tmp_path, capsys):
+    with pytest.raises(SystemExit) as info:
+        pwscore_cli.main(["x", "--hibp-bloom", str(tmp_path / "pwned.bloom")])
+    assert info.value.code == 2
+    assert "--online or --hibp-dump" in capsys.readouterr().err
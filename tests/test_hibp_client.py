@@ -1,3 +1,8 @@
+import pickle
+import threading
+
+import pytest
+
 from pwstrength.features import hibp_client
 
 
@@ -38,3 +43,63 @@ def test_range_cache_prevents_duplicate_fetches():
     assert hibp_client.get_count("password", session=first) == 3
     assert hibp_client.get_count("password", session=second) == 3
     assert len(second.calls) == 0
+
+
+class FailingSession(DummySession):
+    def get(self, url, headers=None, timeout=10):
+        self.calls.append({"url": url, "headers": headers, "timeout": timeout})
+        return DummyResponse(503, "")
+
+
+def test_prevalence_batch_fetches_each_prefix_once():
+    hibp_client.clear_cache()
+    suffix = "1E4C9B93F3F0682250B6CF8331B7EE68FD8"
+    session = DummySession(f"{suffix}:12\nAAAAAA:5")
+    results = hibp_client.get_prevalence_batch(["password", "hunter2", "password", ""], session=session)
+    assert [result.count for result in results] == [12, 0, 12, 0]
+    assert sorted(call["url"][-5:] for call in session.calls) == ["5BAA6", "F3BBB"]
+    assert hibp_client.get_count("password", session=FailingSession("")) == 12
+
+
+def test_prevalence_batch_marks_failed_prefixes(monkeypatch):
+    hibp_client.clear_cache()
+    monkeypatch.setattr(hibp_client.time, "sleep", lambda seconds: None)
+    assert hibp_client.get_prevalence_batch(["password", ""], session=FailingSession("")) == [
+        None,
+        hibp_client.HIBPPrevalence(count=0, log_count=0.0),
+    ]
+
+
+def test_injected_cache_counts_and_evicts():
+    cache = hibp_client.RangeCache(max_entries=2)
+    suffix = "1E4C9B93F3F0682250B6CF8331B7EE68FD8"
+    session = DummySession(f"{suffix}:12")
+    for candidate in ["password", "password", "hunter2", "letmein", "password"]:
+        hibp_client.get_prevalence(candidate, session=session, cache=cache)
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.entries) == (1, 4, 2, 2)
+    assert stats.entry_bytes > 0 and stats.hit_ratio == 0.2
+    assert "5BAA6" in cache and "5BAA6" not in hibp_client.DEFAULT_CACHE
+    assert pickle.loads(pickle.dumps(cache)).stats() == hibp_client.CacheStats(0, 0, 0, 0, 0)
+
+
+def test_cache_byte_budget_and_concurrent_use():
+    big = {f"{number:035X}": number for number in range(100)}
+    cache = hibp_client.RangeCache(max_entries=None, max_bytes=3 * hibp_client._range_bytes(big))
+
+    def worker(offset):
+        for number in range(200):
+            prefix = f"{(number + offset) % 50:05X}"
+            if cache.get(prefix) is None:
+                cache.put(prefix, big)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats.hits + stats.misses == 800
+    assert stats.entries == 3 and stats.entry_bytes <= cache.max_bytes
+    with pytest.raises(ValueError):
+        hibp_client.RangeCache(max_entries=0)
@@ -0,0 +1,52 @@
+import hashlib
+import pickle
+
+import pytest
+
+from pwstrength.core import build_features
+from pwstrength.features.hibp_dump import PwnedDump, convert_dump
+
+BREACHED = {"password": 9545824, "hunter2": 17043, "letmein": 5}
+
+
+def _write_dump(path, counts):
+    lines = sorted(f"{hashlib.sha1(word.encode()).hexdigest().upper()}:{count}" for word, count in counts.items())
+    # neighbours in the same bucket as "password" exercise the binary search
+    lines += ["5BAA6" + "0" * 35 + ":1", "5BAA6" + "F" * 35 + ":2", "FFFF" + "F" * 36 + ":3"]
+    path.write_text("\r\n".join(sorted(lines)) + "\r\n")
+
+
+def test_convert_and_lookup(tmp_path):
+    _write_dump(tmp_path / "dump.txt", BREACHED)
+    assert convert_dump(tmp_path / "dump.txt", tmp_path / "pwned.bin") == 6
+    dump = pickle.loads(pickle.dumps(PwnedDump(tmp_path / "pwned.bin")))
+    for word, count in BREACHED.items():
+        assert dump.get_count(word) == count
+    assert dump.get_count("CorrectHorseBatteryStaple") == 0
+    assert dump.get_count("") == 0
+    assert dump.count_for_digest(b"\xff" * 20) == 3
+    assert len(dump) == 6
+
+
+def test_convert_rejects_unsorted_or_malformed_input(tmp_path):
+    (tmp_path / "unsorted.txt").write_text("B" * 40 + ":1\n" + "A" * 40 + ":1\n")
+    with pytest.raises(ValueError, match="ascending"):
+        convert_dump(tmp_path / "unsorted.txt", tmp_path / "out.bin")
+    (tmp_path / "ntlm.txt").write_text("A" * 32 + ":1\n")
+    with pytest.raises(ValueError, match="SHA1HEX"):
+        convert_dump(tmp_path / "ntlm.txt", tmp_path / "out.bin")
+    assert not (tmp_path / "out.bin").exists()
+
+
+def test_build_features_labels_from_dump(tmp_path):
+    _write_dump(tmp_path / "dump.txt", BREACHED)
+    convert_dump(tmp_path / "dump.txt", tmp_path / "pwned.bin")
+    frame = build_features(
+        ["password", "letmein", "CorrectHorseBatteryStaple"],
+        tau=10,
+        hibp_dump=PwnedDump(tmp_path / "pwned.bin"),
+        columns=["hibp_count", "prevalence_mode", "label_breached"],
+    )
+    assert frame["hibp_count"].tolist() == [9545824, 5, 0]
+    assert frame["prevalence_mode"].tolist() == ["dump"] * 3
+    assert frame["label_breached"].tolist() == [1, 0, 0]
@@ -0,0 +1,91 @@
+import pickle
+import threading
+
+import pytest
+
+from pwstrength.cli import pwscore_cli
+from pwstrength.features import hibp_client
+from pwstrength.features.hibp_store import SQLiteRangeStore
+
+SUFFIX = "1E4C9B93F3F0682250B6CF8331B7EE68FD8"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingSession:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=10):
+        self.calls += 1
+        return type("Response", (), {"status_code": 200, "text": self.text})()
+
+
+def test_store_survives_memory_cache_and_drops_padding(tmp_path):
+    store = SQLiteRangeStore(tmp_path / "ranges.sqlite")
+    session = CountingSession(f"{SUFFIX}:12\nAAAAAA:0")
+    hibp_client.clear_cache()
+    assert hibp_client.get_count("password", session=session, store=store) == 12
+    hibp_client.clear_cache()
+    reopened = SQLiteRangeStore(tmp_path / "ranges.sqlite")
+    assert hibp_client.get_count("password", session=session, store=reopened) == 12
+    assert session.calls == 1
+    assert reopened.get("5BAA6") == {SUFFIX: 12}
+
+
+def test_store_ttl_and_size_limit(tmp_path):
+    clock = Clock()
+    store = SQLiteRangeStore(tmp_path / "ranges.sqlite", ttl=60, max_entries=2, clock=clock)
+    for number, prefix in enumerate(["00000", "00001", "00002"]):
+        clock.now += 1
+        store.put(prefix, {"ABC": number + 1})
+    assert len(store) == 2
+    assert store.get("00000") is None
+    assert store.get("00002") == {"ABC": 3}
+    clock.now += 60
+    assert store.get("00001") is None
+    assert store.purge_expired() == 1
+    with pytest.raises(ValueError):
+        SQLiteRangeStore(tmp_path / "other.sqlite", max_entries=0)
+
+
+def test_store_concurrent_writers(tmp_path):
+    store = pickle.loads(pickle.dumps(SQLiteRangeStore(tmp_path / "ranges.sqlite")))
+
+    def write(worker):
+        for number in range(20):
+            store.put(f"{worker:02X}{number:03X}", {"ABC": number + 1})
+            assert store.get(f"{worker:02X}{number:03X}") == {"ABC": number + 1}
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store) == 80
+
+
+def test_prevalence_batch_reads_store_before_network(tmp_path):
+    store = SQLiteRangeStore(tmp_path / "ranges.sqlite")
+    store.put("5BAA6", {SUFFIX: 7})
+    hibp_client.clear_cache()
+    session = CountingSession("")
+    results = hibp_client.get_prevalence_batch(["password", "hunter2"], session=session, store=store)
+    assert [result.count for result in results] == [7, 0]
+    assert session.calls == 1
+    assert store.get("F3BBB") == {}
+
+
+def test_cli_rejects_cache_without_online(tmp_path, capsys):
+    with pytest.raises(SystemExit) as info:
+        pwscore_cli.main(["x", "--hibp-cache", str(tmp_path / "ranges.db")])
+    assert info.value.code == 2
+    assert "--online" in capsys.readouterr().err
+    assert not (tmp_path / "ranges.db").exists()
@@ -0,0 +1,233 @@
+import pickle
+import threading
+from collections import OrderedDict
+
+import pytest
+from zxcvbn import matching as reference
+
+from pwstrength.adapters import aadi_adapters
+from pwstrength.adapters.dictionary_index import MappedDictionaryIndex, build_index_file, write_index_file
+
+matching = aadi_adapters.MODULES["matching"]
+
+def _dicts(matches):
+    return [match.to_dict() for match in matches]
+
+
+CANDIDATES = [
+    "",
+    "a",
+    "password",
+    "drowssap",
+    "P4ssw0rd!",
+    "CorrectHorseBatteryStaple",
+    "correcthorsebatterystaplecorrecthorsebatterystaple",
+    "Tr1vial!",
+]
+
+
+def test_dictionary_index_matches_reference():
+    for candidate in CANDIDATES:
+        assert _dicts(matching.dictionary_match(candidate)) == reference.dictionary_match(candidate)
+        assert _dicts(matching.reverse_dictionary_match(candidate)) == reference.reverse_dictionary_match(candidate)
+
+
+def test_combined_dictionary_match_with_custom_dictionaries():
+    ranked = {"d1": {"abc": 1, "ab": 2}, "d2": {"cba": 3, "ab": 4}}
+    combined = _dicts(matching.dictionary_and_reverse_match("xabcx", _ranked_dictionaries=ranked))
+    expected = reference.dictionary_match("xabcx", _ranked_dictionaries=ranked)
+    expected += reference.reverse_dictionary_match("xabcx", _ranked_dictionaries=ranked)
+    assert combined == expected
+
+
+def test_custom_dictionary_index_is_built_once(monkeypatch):
+    builds = []
+    build = matching.build_dictionary_index
+    monkeypatch.setattr(matching, "build_dictionary_index", lambda ranked: builds.append(1) or build(ranked))
+    ranked = {"d1": {"abc": 1, "ab": 2}}
+    first = _dicts(matching.dictionary_and_reverse_match("xabcx", _ranked_dictionaries=ranked))
+    assert _dicts(matching.omnimatch("xabcx", _ranked_dictionaries=ranked))
+    assert len(builds) == 1
+    ranked["d2"] = {"cba": 3}
+    second = _dicts(matching.dictionary_and_reverse_match("xabcx", _ranked_dictionaries=ranked))
+    assert len(builds) == 2 and len(second) > len(first)
+
+
+def _l33t_key(match):
+    return (match["i"], match["j"], match["matched_word"], match["dictionary_name"], tuple(sorted(match["sub"].items())))
+
+
+def test_l33t_index_match_finds_reference_matches_once():
+    for candidate in ["p4ssw0rd", "P@$$w0rd1", "1l1l|7", "7r1v14l!", "P@$$w0rd|7!1+5%2(0"]:
+        found = [_l33t_key(match) for match in matching.l33t_index_match(candidate)]
+        assert len(found) == len(set(found))
+        assert set(found) == {_l33t_key(match) for match in reference.l33t_match(candidate)}
+
+
+def test_l33t_index_match_keeps_sub_fields():
+    match = next(m for m in matching.l33t_index_match("p4ssw0rd") if m["matched_word"] == "password")
+    assert match["sub"] == {"4": "a", "0": "o"}
+    assert match["sub_display"] == "4 -> a, 0 -> o"
+
+
+def _match_keys(matches):
+    return [(match["pattern"], match["i"], match["j"], match.get("matched_word")) for match in matches]
+
+
+def test_l33t_feedback_counts_each_match_once():
+    # "!$" reads as "is" under both maps for the ambiguous "7" (l or t); the
+    # match is listed once, so feedback sees a sole dictionary match.
+    matches = aadi_adapters.match_patterns("(7e!$y")
+    assert _match_keys(matches) == [("dictionary", 3, 4, "is")]
+    assert aadi_adapters.human_feedback("(7e!$y", matches).startswith("A word by itself is easy to guess.")
+
+
+def test_l33t_feedback_follows_index_order():
+    # l33t_match listed "tail" and "tall" (7 -> t) before "lail" (7 -> l);
+    # the index walk lists them in table order, and feedback warns about the
+    # first longest match.
+    matches = aadi_adapters.match_patterns("7@1l1l")
+    assert _match_keys(matches) == [
+        ("dictionary", 0, 3, "lail"),
+        ("dictionary", 0, 3, "tail"),
+        ("dictionary", 0, 3, "tall"),
+        ("dictionary", 1, 3, "all"),
+        ("repeat", 2, 5, None),
+    ]
+    assert aadi_adapters.human_feedback("7@1l1l", matches).startswith("Common names and surnames are easy to guess.")
+
+
+def test_date_run_match_matches_reference():
+    for candidate in ["2015_06_04", "1.1.91", "11/11/1991", "19911111", "pw1991-1-11xx2020.02.02", "5551234567"]:
+        assert _dicts(matching.date_run_match(candidate)) == reference.date_match(candidate)
+
+
+def test_spatial_table_match_matches_reference():
+    for candidate in ["", "qwe", "qwerty", "1qaz2wsx", "QWErty!@#", "7896541230", "aoeuidhtns", "zxcvbn,./"]:
+        assert _dicts(matching.spatial_table_match(candidate)) == reference.spatial_match(candidate)
+
+
+def test_custom_spatial_table_is_compiled_once(monkeypatch):
+    compiles = []
+    compile_table = matching.compile_spatial_table
+    monkeypatch.setattr(matching, "compile_spatial_table", lambda graphs: compiles.append(1) or compile_table(graphs))
+    graphs = {"qwerty": matching.GRAPHS["qwerty"]}
+    for candidate in ["qwerty", "asdfgh"]:
+        assert _dicts(matching.spatial_table_match(candidate, _graphs=graphs)) == reference.spatial_match(candidate, _graphs=graphs)
+    assert len(compiles) == 1
+    graphs["keypad"] = matching.GRAPHS["keypad"]
+    assert _dicts(matching.spatial_table_match("7896", _graphs=graphs)) == reference.spatial_match("7896", _graphs=graphs)
+    assert len(compiles) == 2
+
+
+def _repeat_fields(matches):
+    return [{key: value for key, value in dict(match.items()).items() if key != "base_matches"} for match in matches]
+
+
+def test_repeat_scan_match_matches_reference():
+    for candidate in ["", "aa", "aabaab", "aabaabaabaab", "abcabcabcabc", "lovelove123123", "ab\nab\nab"]:
+        assert _repeat_fields(matching.repeat_scan_match(candidate)) == _repeat_fields(reference.repeat_match(candidate))
+
+
+def test_repeat_base_analysis_is_cached():
+    matching._REPEAT_BASE_CACHE.clear()
+    first = matching.repeat_scan_match("lovelove")[0]
+    assert "love" in matching._REPEAT_BASE_CACHE
+    second = matching.repeat_scan_match("xlovelove")[0]
+    assert second["base_matches"] is first["base_matches"]
+
+
+class _EvictingCache(OrderedDict):
+    """Runs another thread's repeat analysis right after a cache lookup."""
+
+    def __init__(self):
+        super().__init__()
+        self.other = None
+
+    def _interleave(self):
+        if self.other is None and threading.current_thread() is threading.main_thread():
+            self.other = threading.Thread(target=matching.analyze_repeat_base, args=("zz",))
+            self.other.start()
+            self.other.join(0.2)
+
+    def __contains__(self, key):
+        found = super().__contains__(key)
+        self._interleave()
+        return found
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        self._interleave()
+        return value
+
+
+def test_repeat_base_cache_survives_concurrent_eviction(monkeypatch):
+    cache = _EvictingCache()
+    monkeypatch.setattr(matching, "_REPEAT_BASE_CACHE", cache)
+    monkeypatch.setattr(matching, "REPEAT_CACHE_SIZE", 1)
+    expected = matching.analyze_repeat_base("ab")
+    cache.other = None
+    assert matching.analyze_repeat_base("ab") == expected
+    cache.other.join()
+    assert len(cache) == 1
+
+
+def test_match_records_are_immutable_and_picklable():
+    sequence = aadi_adapters.estimate_guesses("lovelove2015!")["sequence"]
+    with pytest.raises(AttributeError):
+        sequence[0].token = "changed"
+    restored = pickle.loads(pickle.dumps(sequence))
+    assert restored == sequence
+    assert [match.to_dict() for match in restored] == [match.to_dict() for match in sequence]
+
+
+def test_mapped_dictionary_index_returns_same_entries(tmp_path):
+    ranked = {"d1": {"abc": 1, "ab": 2, "ünï": 3}, "d2": {"cba": 3, "ab": 4}}
+    index = matching.build_dictionary_index(ranked)
+    path = tmp_path / "dictionary.idx"
+    write_index_file(str(path), index, ranked)
+    mapped = MappedDictionaryIndex(str(path))
+    assert len(mapped) == len(index)
+    for key in list(index) + ["abcd", "x", "", "ü"]:
+        assert mapped.get(key) == index.get(key)
+    assert mapped.matches_lists(ranked)
+    assert not mapped.matches_lists({"d1": ranked["d1"]})
+
+
+def test_use_dictionary_index_serves_default_matches(tmp_path):
+    path = tmp_path / "dictionary.idx"
+    build_index_file(str(path))
+    original = matching.get_dictionary_index()
+    expected = [_dicts(aadi_adapters.match_patterns(candidate)) for candidate in CANDIDATES]
+    try:
+        aadi_adapters.use_dictionary_index(str(path))
+        assert isinstance(matching.get_dictionary_index(), MappedDictionaryIndex)
+        assert [_dicts(aadi_adapters.match_patterns(candidate)) for candidate in CANDIDATES] == expected
+    finally:
+        matching.set_dictionary_index(original)
+
+
+def test_matching_module_is_published_after_its_index(tmp_path, monkeypatch):
+    path = tmp_path / "dictionary.idx"
+    build_index_file(str(path))
+    original = matching.get_dictionary_index()
+    install = aadi_adapters._install_dictionary_index
+    seen = []
+
+    def checking_install(module, index_path):
+        seen.append("matching" in aadi_adapters._LOADED)
+        install(module, index_path)
+
+    monkeypatch.setattr(aadi_adapters, "_install_dictionary_index", checking_install)
+    monkeypatch.delitem(aadi_adapters._LOADED, "matching")
+    monkeypatch.setenv(aadi_adapters.DICTIONARY_INDEX_ENV, str(tmp_path / "missing.idx"))
+    try:
+        with pytest.raises(OSError):
+            aadi_adapters.MODULES["matching"]
+        assert "matching" not in aadi_adapters._LOADED
+        monkeypatch.setenv(aadi_adapters.DICTIONARY_INDEX_ENV, str(path))
+        assert aadi_adapters.MODULES["matching"] is matching
+        assert isinstance(matching.get_dictionary_index(), MappedDictionaryIndex)
+        assert seen == [False, False]
+    finally:
+        matching.set_dictionary_index(original)
@@ -0,0 +1,79 @@
+import pytest
+from zxcvbn import scoring as reference
+
+from pwstrength.adapters import aadi_adapters
+
+scoring = aadi_adapters.MODULES["scoring"]
+
+CANDIDATES = [
+    "a",
+    "password",
+    "Tr0ub4dor&3",
+    "correcthorsebatterystaple",
+    "lovelove2015!",
+    "qwertyuiop19871231zyx",
+    "x9$kQ!2mZ#7vL@4p",
+]
+
+
+def test_log_search_matches_decimal_search():
+    for candidate in CANDIDATES:
+        matches = aadi_adapters.match_patterns(candidate)
+        exact = scoring.most_guessable_match_sequence(candidate, matches)
+        approx = scoring.most_guessable_match_sequence_log(candidate, matches)
+        assert approx["sequence"] == exact["sequence"]
+        assert approx["matches"] == exact["matches"]
+        assert approx["guesses_log10"] == pytest.approx(exact["guesses_log10"], abs=scoring.LOG_SEARCH_TOLERANCE)
+
+
+def test_estimate_guesses_engine_selection():
+    exact = aadi_adapters.estimate_guesses("Tr0ub4dor&3")
+    approx = aadi_adapters.estimate_guesses("Tr0ub4dor&3", engine="log")
+    assert approx["score"] == exact["score"]
+    assert approx["guesses"] == pytest.approx(exact["guesses"], rel=1e-9)
+    with pytest.raises(ValueError):
+        aadi_adapters.estimate_guesses("Tr0ub4dor&3", engine="float")
+
+
+def test_bruteforce_spans_match_reference_search():
+    for candidate in ["x9$kQ!2mZ#7vL@4p", "a", "zz", "Tr0ub4dor&3"]:
+        matches = [match for match in aadi_adapters.match_patterns(candidate) if match.pattern != "regex"]
+        result = scoring.most_guessable_match_sequence(candidate, matches)
+        expected = reference.most_guessable_match_sequence(candidate, [match.to_dict() for match in matches])
+        assert result["guesses"] == expected["guesses"]
+        assert [match.to_dict() for match in result["sequence"]] == expected["sequence"]
+
+
+def test_memoized_variations_are_bit_identical():
+    for graph in ["qwerty", "keypad"]:
+        for length in range(1, 25):
+            for turns in range(1, length + 1):
+                for shifted in range(0, length + 1, 3):
+                    match = {"graph": graph, "token": "x" * length, "turns": turns, "shifted_count": shifted}
+                    assert scoring.spatial_guesses(match) == reference.spatial_guesses(match)
+    for upper in range(0, 12):
+        for lower in range(0, 12):
+            for token in ["A" * upper + "b" * lower, "b" * lower + "A" * upper, ("Ab" * 12)[: upper + lower]]:
+                match = {"token": token}
+                assert scoring.uppercase_variations(match) == reference.uppercase_variations(match)
+    for subbed in range(0, 8):
+        for unsubbed in range(0, 8):
+            match = {"l33t": True, "token": "4" * subbed + "a" * unsubbed + "3", "sub": {"4": "a", "3": "e"}}
+            assert scoring.l33t_variations(match) == reference.l33t_variations(match)
+
+
+def test_human_feedback_scores_raw_matches():
+    matches = aadi_adapters.match_patterns("password")
+    assert "guesses_log10" not in matches[0]
+    assert aadi_adapters.human_feedback("password", matches) == "This is similar to a commonly used password. Add another word or two. Uncommon words are better."
+
+
+def test_estimate_guesses_returns_annotated_matches(monkeypatch):
+    matches = aadi_adapters.match_patterns("lovelove2015!")
+    guess_info = aadi_adapters.estimate_guesses("lovelove2015!", matches)
+    annotated = guess_info["matches"]
+    assert [(match.pattern, match.i, match.j) for match in annotated] == [(match.pattern, match.i, match.j) for match in matches]
+    assert all("guesses_log10" in match for match in annotated)
+    expected = aadi_adapters.human_feedback("lovelove2015!", matches, score=guess_info["score"])
+    monkeypatch.setattr(scoring, "estimate_match", lambda match, password: pytest.fail("match scored twice"))
+    assert aadi_adapters.human_feedback("lovelove2015!", annotated, score=guess_info["score"]) == expected
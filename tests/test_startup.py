@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+# Import time allowed for what every ``pwscore`` run loads before scoring (the
+# CLI module and the scoring stack: core, pipeline, schema, numpy, ...), in
+# milliseconds. Override with PWSTRENGTH_IMPORT_BUDGET_MS on slow machines.
+IMPORT_BUDGET_MS = float(os.environ.get("PWSTRENGTH_IMPORT_BUDGET_MS", 300))
+HEAVY_MODULES = [
+    "pandas",
+    "sklearn",
+    "matplotlib",
+    "requests",
+    "zxcvbn",
+    "_aadi_pw.matching_script",
+    "_aadi_pw.time_estimates",
+]
+
+
+def _run(code):
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+
+
+def _package_import_ms(stderr):
+    # Sum the cumulative times of top-level pwstrength imports; everything they
+    # pull in is nested under them, so nothing is counted twice.
+    total = 0.0
+    for line in stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].startswith(" pwstrength"):
+            total += int(fields[1]) / 1000.0
+    if not total:
+        raise AssertionError("pwstrength missing from -X importtime output")
+    return total
+
+
+def test_cli_startup_stays_within_budget():
+    code = "import pwstrength.cli.pwscore_cli, pwstrength.core"
+    best = min(_package_import_ms(_run(code).stderr) for _ in range(3))
+    assert best <= IMPORT_BUDGET_MS, f"CLI startup imports took {best:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+
+
+def test_scoring_stack_import_defers_heavy_modules():
+    code = "import sys, pwstrength.core; print(' '.join(sorted(sys.modules)))"
+    loaded = set(_run(code).stdout.split())
+    assert not loaded.intersection(HEAVY_MODULES)
@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+from zxcvbn import time_estimates as reference
+
+from pwstrength.adapters import aadi_adapters
+from pwstrength.schema import SCENARIOS
+
+time_estimates = aadi_adapters.MODULES["time"]
+
+GUESSES = [0, 1, 11, 250, 450, 3600, 173867200, 10**12, 10**20, Decimal("1e400")]
+
+
+def test_batch_matches_decimal_displays_and_scores():
+    batch = aadi_adapters.crack_times_batch(GUESSES)
+    for index, guesses in enumerate(GUESSES):
+        expected = reference.estimate_attack_times(guesses)
+        for scenario, display in expected["crack_times_display"].items():
+            assert batch["crack_times_display"][scenario][index] == display
+            assert batch["crack_times_seconds"][scenario][index] == float(expected["crack_times_seconds"][scenario])
+        assert batch["score"][index] == expected["score"]
+
+
+def test_single_value_wrapper():
+    result = aadi_adapters.crack_times(250)
+    assert result["crack_times_display"]["online_throttling_100_per_hour"] == "3 hours"
+    assert result["crack_times_seconds"]["online_no_throttling_10_per_second"] == 25.0
+    assert result["score"] == 0
+
+
+def test_schema_scenarios_follow_the_script():
+    assert SCENARIOS == tuple(time_estimates.ATTACK_SCENARIOS)